@@ -1,4 +1,9 @@
-from app import app
+import os
+
+# Serverless invocations must not hold pooled connections between requests
+os.environ.setdefault('DB_SERVERLESS', 'TRUE')
+
+from app import app  # noqa: E402
 
 # This is the entry point for Vercel
 application = app
@@ -1,8 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import hashlib
 import os
+import json
 import logging
+import threading
+import time
+import metrics
+import profiling
+from database import get_backend_name, get_database_url, get_pool_stats
 from database_service import DatabaseService
+from job_queue import JobQueue
+from models import Grant
+from serialization import COMPRESSION_CONFIG, compress, dumps
+from tag_query import TagQueryError, all_of, any_of, parse_tag_query
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,33 +22,216 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
-# Initialize database service
-try:
-    db_service = DatabaseService()
-    logger.info("Database service initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize database service: {e}")
-    db_service = None
+# Database service, created on the first request that needs it so importing
+# the app (e.g. a serverless cold start) does no database or network work
+db_service = None
+db_service_lock = threading.Lock()
+
+def auto_setup_enabled():
+    """Whether the first request applies migrations and default tags (DB_AUTO_SETUP)"""
+    # setup_database.py manages persistent schemas; nothing else can prepare an in-memory one
+    default = 'TRUE' if get_backend_name(get_database_url()) == 'memory' else 'FALSE'
+    return os.getenv('DB_AUTO_SETUP', default).upper() == 'TRUE'
+
+def get_db_service():
+    """Return the shared database service, creating it on first use (None if that fails)"""
+    global db_service
+    if db_service is None:
+        with db_service_lock:
+            if db_service is None:
+                try:
+                    db_service = DatabaseService(setup=auto_setup_enabled())
+                    logger.info("Database service initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize database service: {e}")
+    return db_service
+
+# Send a Server-Timing breakdown on every response, not only when the client asks for it
+METRICS_DEBUG_HEADER = os.getenv('METRICS_DEBUG_HEADER', 'FALSE').upper() == 'TRUE'
+
+@app.before_request
+def start_request_metrics():
+    """Start collecting the per-request timing breakdown"""
+    request.environ['grant_api.metrics_token'] = metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record route latency and attach Server-Timing when debugging"""
+    timings = metrics.current_timings()
+    if timings is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method, status = request.method, str(response.status_code)
+
+    def observe():
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - timings.started, route=route, method=method)
+        metrics.HTTP_REQUESTS.inc(route=route, method=method, status=status)
+
+    if response.is_streamed:
+        # The body is generated after this hook returns; record once it has been sent
+        response.call_on_close(observe)
+    else:
+        observe()
+    if METRICS_DEBUG_HEADER or request.headers.get('X-Debug-Timing', '').lower() in ('1', 'true', 'yes'):
+        response.headers['Server-Timing'] = timings.server_timing()
+    return response
+
+@app.teardown_request
+def end_request_metrics(exc):
+    token = request.environ.pop('grant_api.metrics_token', None)
+    if token is not None:
+        metrics.end_request(token)
+
+def _service_metrics():
+    """Cache and pool metrics read at scrape time"""
+    samples = []
+    if db_service is not None:
+        llm_stats = db_service.tagging_service.llm_cache.stats()
+        result_stats = db_service.result_cache.stats()
+        samples += [
+            ('grant_llm_cache_lookups_total', 'counter', 'LLM tag cache lookups by outcome', [
+                ({'result': 'hit'}, llm_stats['hits']),
+                ({'result': 'disk_hit'}, llm_stats['disk_hits']),
+                ({'result': 'miss'}, llm_stats['misses'])
+            ]),
+            ('grant_llm_cache_hit_ratio', 'gauge', 'Share of LLM tag cache lookups served from cache',
+             [({}, llm_stats['hit_rate'])]),
+            ('grant_llm_cache_entries', 'gauge', 'Entries in the in-memory LLM tag cache',
+             [({}, llm_stats['entries'])]),
+            ('grant_result_cache_lookups_total', 'counter', 'Read result cache lookups by outcome', [
+                ({'result': 'hit'}, result_stats['hits']),
+                ({'result': 'miss'}, result_stats['misses'])
+            ]),
+            ('grant_result_cache_hit_ratio', 'gauge', 'Share of read result cache lookups served from cache',
+             [({}, result_stats['hit_rate'])]),
+        ]
+    pool_stats = get_pool_stats()
+    samples += [
+        ('grant_db_pool_checked_out', 'gauge', 'Connections currently checked out of the pool',
+         [({'engine': name}, stats['checked_out']) for name, stats in pool_stats.items()]),
+        ('grant_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a pooled connection',
+         [({'engine': name}, stats['wait_seconds']) for name, stats in pool_stats.items()]),
+    ]
+    return samples
+
+metrics.REGISTRY.add_collector(_service_metrics)
+
+@app.before_request
+def start_request_profile():
+    """Profile this request's tagging and database calls when X-Profile asks for it"""
+    mode = None
+    if profiling.PROFILE_CONFIG['allow_header']:
+        mode = profiling.parse_mode(request.headers.get('X-Profile'))
+    request.environ['grant_api.profile_token'] = profiling.start_request(mode)
+
+@app.after_request
+def report_request_profile(response):
+    """Name the profile files written for this request"""
+    outputs = profiling.request_outputs()
+    if outputs:
+        response.headers['X-Profile-Output'] = ', '.join(outputs)
+    return response
+
+@app.teardown_request
+def end_request_profile(exc):
+    token = request.environ.pop('grant_api.profile_token', None)
+    if token is not None:
+        profiling.end_request(token)
+
+def _parse_listing_args(args):
+    """Validate pagination, sort and projection query parameters for grant listings"""
+    after_id = args.get('after_id', type=int)
+    limit = args.get('limit', type=int)
+    if (after_id is None) != ('after_id' not in args) or (limit is None) != ('limit' not in args):
+        raise ValueError('after_id and limit must be integers')
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be positive')
+    
+    sort = args.get('sort', 'id')
+    if sort.lstrip('-') not in DatabaseService.GRANT_SORT_COLUMNS:
+        raise ValueError(f"sort must be one of: {', '.join(DatabaseService.GRANT_SORT_COLUMNS)}")
+    
+    fields = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in Grant.DICT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    
+    include_total = args.get('total', 'true').lower() not in ('0', 'false', 'no')
+    return {
+        'after_id': after_id,
+        'limit': limit,
+        'sort': sort,
+        'fields': fields,
+        'include_total': include_total
+    }
+
+def _json_response(payload, status=200, etag=False):
+    """Serialize with the fast encoder and compress for the client when enabled"""
+    body = dumps(payload)
+    if etag:
+        # Weak because the same JSON is sent with different Content-Encodings
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if request.method == 'GET' and request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+    body, encoding = compress(body, request.headers.get('Accept-Encoding', ''))
+    response = Response(body, status=status, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if COMPRESSION_CONFIG['enabled']:
+        response.vary.add('Accept-Encoding')
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+# Job queue for asynchronous ingestion, opened on first use
+job_queue = None
+
+def get_job_queue():
+    """Return the shared job queue, opening it on first use"""
+    global job_queue
+    if job_queue is None:
+        job_queue = JobQueue.from_env()
+    return job_queue
 
 @app.route('/api/grants', methods=['GET'])
 def get_grants():
-    """Get all grants"""
+    """Get grants, optionally keyset-paginated, sorted and projected"""
     try:
+        db_service = get_db_service()
         if not db_service:
             return jsonify({
                 'success': False,
                 'error': 'Database service not available'
             }), 500
+        
+        try:
+            listing_args = _parse_listing_args(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
             
-        result = db_service.get_all_grants()
+        result = db_service.get_all_grants(**listing_args)
         if result['success']:
-            return jsonify({
+            response = {
                 'success': True,
                 'grants': result['grants'],
-                'count': len(result['grants'])
-            })
+                'count': len(result['grants']),
+                'next_after_id': result['next_after_id']
+            }
+            if 'total' in result:
+                response['total'] = result['total']
+            return _json_response(response, etag=True)
         else:
-            return jsonify(result), 500
+            return jsonify({
+                'success': False,
+                'error': result['error']
+            }), 400 if result.get('invalid_request') else 500
             
     except Exception as e:
         logger.error(f"Error in get_grants: {e}")
@@ -46,10 +240,20 @@ def get_grants():
             'error': str(e)
         }), 500
 
+def _validate_grant(grant):
+    """Return the grant's name and description, or None if either is missing"""
+    if isinstance(grant, dict) and grant.get('grant_name') and grant.get('grant_description'):
+        return {
+            'grant_name': grant['grant_name'],
+            'grant_description': grant['grant_description']
+        }
+    return None
+
 @app.route('/api/grants', methods=['POST'])
 def add_grants():
-    """Add new grants with automatic tagging"""
+    """Add new grants with automatic tagging (queued for a worker with ?async=1)"""
     try:
+        db_service = get_db_service()
         if not db_service:
             return jsonify({
                 'success': False,
@@ -68,13 +272,9 @@ def add_grants():
         grants_to_add = data if isinstance(data, list) else [data]
         
         # Validate grants
-        validated_grants = []
-        for grant in grants_to_add:
-            if grant.get('grant_name') and grant.get('grant_description'):
-                validated_grants.append({
-                    'grant_name': grant['grant_name'],
-                    'grant_description': grant['grant_description']
-                })
+        validated_grants = [
+            validated for validated in (_validate_grant(grant) for grant in grants_to_add) if validated
+        ]
         
         if not validated_grants:
             return jsonify({
@@ -82,6 +282,16 @@ def add_grants():
                 'error': 'No valid grants provided'
             }), 400
         
+        # Hand the grants to a background worker instead of tagging them in the request
+        if request.args.get('async', 'false').lower() in ('1', 'true', 'yes'):
+            job_id = get_job_queue().enqueue('add_grants', validated_grants)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'count': len(validated_grants)
+            }), 202
+        
         # Add grants to database
         result = db_service.add_grants(validated_grants)
         
@@ -90,7 +300,8 @@ def add_grants():
                 'success': True,
                 'message': result['message'],
                 'grants_added': result['grants_added'],
-                'count': len(result['grants_added'])
+                'count': len(result['grants_added']),
+                'duplicates': result['duplicates']
             })
         else:
             return jsonify(result), 500
@@ -102,23 +313,97 @@ def add_grants():
             'error': str(e)
         }), 500
 
+@app.route('/api/grants/stream', methods=['POST'])
+def stream_grants():
+    """
+    Bulk-ingest grants from an NDJSON body (one grant object per line).
+    
+    Lines are parsed as they arrive, tagged and inserted in batches of
+    INGEST_BATCH_SIZE with one commit per batch, and a result line per record
+    is streamed back, followed by a summary line. Memory use stays bounded
+    by the batch size regardless of upload size.
+    """
+    db_service = get_db_service()
+    if not db_service:
+        return jsonify({
+            'success': False,
+            'error': 'Database service not available'
+        }), 500
+    
+    batch_size = max(1, int(os.getenv('INGEST_BATCH_SIZE', 500)))
+    
+    def ingest_batch(batch, summary):
+        result = db_service.add_grants([grant for _, grant in batch])
+        if result['success']:
+            summary['added'] += len(result['grants_added'])
+            summary['duplicates'] += len(result['duplicates'])
+            duplicates = {duplicate['index']: duplicate['existing_id'] for duplicate in result['duplicates']}
+            added = iter(result['grants_added'])
+            for index, (line_number, _) in enumerate(batch):
+                if index in duplicates:
+                    yield json.dumps({'line': line_number, 'success': True, 'duplicate': True, 'id': duplicates[index]}) + '\n'
+                else:
+                    grant = next(added)
+                    yield json.dumps({'line': line_number, 'success': True, 'id': grant['id'], 'tags': grant['tags']}) + '\n'
+        else:
+            summary['failed'] += len(batch)
+            for line_number, _ in batch:
+                yield json.dumps({'line': line_number, 'success': False, 'error': result['error']}) + '\n'
+    
+    def generate():
+        summary = {'added': 0, 'duplicates': 0, 'failed': 0, 'invalid': 0}
+        batch = []
+        for line_number, raw_line in enumerate(request.stream, start=1):
+            raw_line = raw_line.strip()
+            if not raw_line:
+                continue
+            
+            try:
+                grant = _validate_grant(json.loads(raw_line))
+            except ValueError:
+                grant = None
+            if grant is None:
+                summary['invalid'] += 1
+                yield json.dumps({
+                    'line': line_number,
+                    'success': False,
+                    'error': 'Invalid grant: expected a JSON object with grant_name and grant_description'
+                }) + '\n'
+                continue
+            
+            batch.append((line_number, grant))
+            if len(batch) >= batch_size:
+                yield from ingest_batch(batch, summary)
+                batch = []
+        
+        if batch:
+            yield from ingest_batch(batch, summary)
+        yield json.dumps({'summary': summary, 'success': summary['failed'] == 0 and summary['invalid'] == 0}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/tags', methods=['GET'])
 def get_tags():
-    """Get all available tags"""
+    """Get all available tags, with per-tag grant counts when ?with_counts=true"""
     try:
+        db_service = get_db_service()
         if not db_service:
             return jsonify({
                 'success': False,
                 'error': 'Database service not available'
             }), 500
-            
-        result = db_service.get_all_tags()
+        
+        with_counts = request.args.get('with_counts', 'false').lower() in ('1', 'true', 'yes')
+        result = db_service.get_all_tags(with_counts=with_counts)
         if result['success']:
-            return jsonify({
+            response = {
                 'success': True,
                 'tags': result['tags'],
                 'count': len(result['tags'])
-            })
+            }
+            if with_counts:
+                response['counts'] = result['counts']
+            return _json_response(response, etag=True)
         else:
             return jsonify(result), 500
             
@@ -129,28 +414,109 @@ def get_tags():
             'error': str(e)
         }), 500
 
-@app.route('/api/grants/search', methods=['POST'])
-def search_grants():
-    """Search grants by tags"""
+@app.route('/api/tags/facets', methods=['GET'])
+def get_tag_facets():
+    """Grant counts per tag within the current selection (?selected=water,drought)"""
     try:
+        db_service = get_db_service()
         if not db_service:
             return jsonify({
                 'success': False,
                 'error': 'Database service not available'
             }), 500
+        
+        selected = [tag.strip() for tag in request.args.get('selected', '').split(',') if tag.strip()]
+        result = db_service.get_tag_facets(selected)
+        if result['success']:
+            return jsonify(result)
+        else:
+            return jsonify(result), 500
             
-        data = request.get_json()
-        search_tags = data.get('tags', []) if data else []
+    except Exception as e:
+        logger.error(f"Error in get_tag_facets: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/grants/search', methods=['GET', 'POST'])
+def search_grants():
+    """
+    Search grants by tags and/or free text.
+    
+    Accepts {"tags": [...]} with an optional "match": "all" (default "any"),
+    or {"query": "(water AND drought) AND NOT flood"} for boolean expressions.
+    Adding "q" runs a ranked full-text search, filtered by the tag criteria
+    and paginated with "limit"/"offset". GET takes the same keys as query
+    parameters, with tags comma-separated.
+    """
+    try:
+        db_service = get_db_service()
+        if not db_service:
+            return jsonify({
+                'success': False,
+                'error': 'Database service not available'
+            }), 500
+        
+        if request.method == 'POST':
+            data = request.get_json() or {}
+        else:
+            data = {key: request.args[key] for key in ('query', 'match', 'q', 'limit', 'offset') if key in request.args}
+            data['tags'] = [tag.strip() for tag in request.args.get('tags', '').split(',') if tag.strip()]
         
-        result = db_service.search_grants_by_tags(search_tags)
+        search_tags = data.get('tags', [])
+        tag_query = data.get('query')
+        match = data.get('match', 'any')
+        text = data.get('q') or request.args.get('q')
         
-        if result['success']:
+        if match not in ('any', 'all'):
+            return jsonify({
+                'success': False,
+                'error': 'match must be "any" or "all"'
+            }), 400
+        
+        try:
+            if text:
+                limit = min(int(data.get('limit') or request.args.get('limit') or 20), DatabaseService.MAX_PAGE_SIZE)
+                offset = int(data.get('offset') or request.args.get('offset') or 0)
+                if limit < 1 or offset < 0:
+                    raise ValueError('limit must be positive and offset non-negative')
+                
+                tag_filter = None
+                if tag_query:
+                    tag_filter = parse_tag_query(tag_query)
+                elif search_tags:
+                    tag_filter = all_of(search_tags) if match == 'all' else any_of(search_tags)
+                result = db_service.search_grants_fulltext(text, tag_filter, limit=limit, offset=offset)
+            elif tag_query:
+                result = db_service.search_grants_by_query(parse_tag_query(tag_query))
+            elif search_tags and match == 'all':
+                result = db_service.search_grants_by_query(all_of(search_tags))
+            else:
+                result = db_service.search_grants_by_tags(search_tags)
+        except TagQueryError as e:
             return jsonify({
+                'success': False,
+                'error': f'Invalid tag query: {e}'
+            }), 400
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        if result['success']:
+            response = {
                 'success': True,
                 'grants': result['grants'],
                 'count': len(result['grants']),
                 'search_tags': search_tags
-            })
+            }
+            if tag_query:
+                response['query'] = tag_query
+            if text:
+                response.update({'q': text, 'total': result['total'], 'limit': limit, 'offset': offset})
+            return _json_response(response, etag=True)
         else:
             return jsonify(result), 500
             
@@ -165,6 +531,7 @@ def search_grants():
 def get_grant(grant_id):
     """Get a specific grant by ID"""
     try:
+        db_service = get_db_service()
         if not db_service:
             return jsonify({
                 'success': False,
@@ -185,6 +552,7 @@ def get_grant(grant_id):
 def delete_grant(grant_id):
     """Delete a grant by ID"""
     try:
+        db_service = get_db_service()
         if not db_service:
             return jsonify({
                 'success': False,
@@ -201,16 +569,42 @@ def delete_grant(grant_id):
             'error': str(e)
         }), 500
 
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status, progress and result of an asynchronous ingest job"""
+    try:
+        job = get_job_queue().get(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in get_job: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
-        db_status = "connected" if db_service else "disconnected"
+        # The service connects lazily, so check that the database actually answers
+        db_service = get_db_service()
+        db_status = "connected" if db_service and db_service.check_connection() else "disconnected"
         return jsonify({
             'success': True,
             'message': 'Grant Tagging API is running',
             'version': '1.0.0',
-            'database': db_status
+            'database': db_status,
+            'pool': get_pool_stats()
         })
     except Exception as e:
         return jsonify({
@@ -218,18 +612,27 @@ def health_check():
             'error': str(e)
         }), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for this process"""
+    return Response(metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
     environment = os.getenv('ENVIRONMENT')
     if environment == 'development':
         print("Starting Grant Tagging API...")
         print("Available endpoints:")
-        print("  GET    /api/grants - Get all grants")
-        print("  POST   /api/grants - Add new grants")
+        print("  GET    /api/grants - Get grants (?after_id=&limit=&sort=&fields=&total=)")
+        print("  POST   /api/grants - Add new grants (?async=1 to queue them)")
+        print("  GET    /api/jobs/<id> - Get async ingest job status")
+        print("  POST   /api/grants/stream - Stream NDJSON grants in batches")
         print("  GET    /api/grants/<id> - Get specific grant")
         print("  DELETE /api/grants/<id> - Delete grant")
-        print("  GET    /api/tags - Get available tags")
-        print("  POST   /api/grants/search - Search grants by tags")
+        print("  GET    /api/tags - Get available tags (?with_counts=true)")
+        print("  GET    /api/tags/facets - Tag counts within a selection (?selected=a,b)")
+        print("  POST   /api/grants/search - Search grants by tags, boolean tag query or text (q)")
         print("  GET    /api/health - Health check")
+        print("  GET    /api/metrics - Prometheus metrics")
         app.run(debug=True, host='0.0.0.0', port=5000)
     elif environment == 'vercel_production':
         print("Starting Grant Tagging API in vercel production mode...")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the API.
+
+Each run starts a fresh interpreter and measures how long importing an entry
+point takes and how long the first request (GET /api/health, which creates
+the database service) takes after that. Both entry points are timed: `app`
+(app.py) and `api` (api/index.py, the module Vercel loads). Runs against an
+in-memory database unless DATABASE_URL is already set.
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --entry api --runs 10 --max-import-ms 400 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module and WSGI attribute of each entry point
+ENTRY_POINTS = {
+    'app': ('app', 'app'),
+    'api': ('api.index', 'application')
+}
+
+# Runs inside the child interpreter and prints its timings as JSON
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+getattr(module, sys.argv[2]).test_client().get('/api/health')
+first_request = time.perf_counter()
+heavy = [name for name in ('openai', 'flask_sqlalchemy') if name in sys.modules]
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (first_request - imported) * 1000,
+    'heavy_modules_after_import': heavy
+}))
+"""
+
+
+def run_once(env, entry):
+    """Time one cold start of an entry point in a new interpreter"""
+    module, attribute = ENTRY_POINTS[entry]
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, module, attribute],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(entry, runs):
+    """Median and minimum timings of one entry point"""
+    return {
+        'entry': entry,
+        'module': ENTRY_POINTS[entry][0],
+        'import_ms_median': round(statistics.median(run['import_ms'] for run in runs), 1),
+        'import_ms_min': round(min(run['import_ms'] for run in runs), 1),
+        'first_request_ms_median': round(statistics.median(run['first_request_ms'] for run in runs), 1),
+        'heavy_modules_after_import': runs[-1]['heavy_modules_after_import']
+    }
+
+
+def main():
+    """Run the benchmark and print a summary"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entry', choices=sorted(ENTRY_POINTS), action='append',
+                        help='entry point to time (repeatable; default: all)')
+    parser.add_argument('--runs', type=int, default=5, help='number of fresh interpreters to time per entry point')
+    parser.add_argument('--max-import-ms', type=float, default=None,
+                        help='exit non-zero if any median import time exceeds this')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'memory://')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    entries = args.entry or list(ENTRY_POINTS)
+    results = []
+    for entry in entries:
+        # Warm the OS file cache and bytecode so every timed run starts from the same state
+        run_once(env, entry)
+        results.append(summarize(entry, [run_once(env, entry) for _ in range(args.runs)]))
+
+    if args.json:
+        print(json.dumps({'runs': args.runs, 'database_url': env['DATABASE_URL'], 'entries': results}, indent=2))
+    else:
+        print(f"🚀 Cold start over {args.runs} runs ({env['DATABASE_URL']})")
+        for summary in results:
+            print(f"  import {summary['module']}:")
+            print(f"    import:        {summary['import_ms_median']} ms median, {summary['import_ms_min']} ms min")
+            print(f"    first request: {summary['first_request_ms_median']} ms median")
+            if summary['heavy_modules_after_import']:
+                print(f"    ⚠️  Imported eagerly: {', '.join(summary['heavy_modules_after_import'])}")
+
+    failed = False
+    for summary in results:
+        if args.max_import_ms is not None and summary['import_ms_median'] > args.max_import_ms:
+            print(f"❌ Median import time of {summary['module']} {summary['import_ms_median']} ms exceeds {args.max_import_ms} ms")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
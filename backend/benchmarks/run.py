@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the tagging, ingest, listing and search hot paths.
+
+For each corpus size a synthetic corpus is generated from data/grants.json
+and the runner measures:
+    tagging.assign_tags        rule-based tagging, one grant per call (grants/s)
+    tagging.assign_tags_batch  rule-based tagging of the whole corpus (grants/s)
+    ingest.add_grants          DatabaseService.add_grants in INGEST_BATCH_SIZE batches (grants/s)
+    listing.get_all_grants     full listing and a 100-grant keyset page (ms)
+    search.search_grants_by_tags / search_grants_by_query   tag searches (ms)
+
+The LLM is disabled and the result cache is off, so every call does real
+work. Results can be written as JSON and compared with an earlier run:
+
+    python benchmarks/run.py --sizes 1k,10k --output results.json
+    python benchmarks/run.py --sizes 1k,10k --compare results.json --fail-threshold 20
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Measure the uncached, rule-based paths
+os.environ.pop('OPENAI_API_KEY', None)
+os.environ['RESULT_CACHE_TTL'] = '0'
+
+from benchmarks.corpus import generate_corpus, parse_size  # noqa: E402
+
+# Tag searches timed at every size: (label, tags, match)
+SEARCHES = [
+    ('any:water', ['water'], 'any'),
+    ('any:education,training,outreach', ['education', 'training', 'outreach'], 'any'),
+    ('all:soil,water', ['soil', 'water'], 'all'),
+]
+
+
+def measure(func, repeat):
+    """Call func repeat times and return timing statistics in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'min_ms': round(timings[0], 3),
+        'repeat': repeat
+    }
+
+
+def result(benchmark, size, value, unit, higher_is_better, **extra):
+    entry = {
+        'benchmark': benchmark,
+        'size': size,
+        'value': round(value, 3),
+        'unit': unit,
+        'higher_is_better': higher_is_better
+    }
+    entry.update(extra)
+    return entry
+
+
+def bench_tagging(corpus):
+    """Rule-based tagging throughput, per grant and as one batch"""
+    from tagging_service import GrantTaggingService
+
+    service = GrantTaggingService()
+    size = len(corpus)
+
+    start = time.perf_counter()
+    for grant in corpus:
+        service.assign_tags(grant['grant_name'], grant['grant_description'])
+    per_grant_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    service.assign_tags_batch(corpus)
+    batch_seconds = time.perf_counter() - start
+    service.shutdown()
+
+    return [
+        result('tagging.assign_tags', size, size / per_grant_seconds, 'grants/s', True,
+               seconds=round(per_grant_seconds, 3)),
+        result('tagging.assign_tags_batch', size, size / batch_seconds, 'grants/s', True,
+               seconds=round(batch_seconds, 3)),
+    ]
+
+
+def bench_database(corpus, backend, workdir, repeat):
+    """Ingest rate, then listing and search latency on the ingested corpus"""
+    from database_service import DatabaseService
+    from migrations import drop_schema
+
+    size = len(corpus)
+    if backend == 'memory':
+        database_url = 'memory://'
+    else:
+        database_url = f"sqlite:///{os.path.join(workdir, f'bench_{size}.sqlite3')}"
+
+    service = DatabaseService(database_url, setup=False)
+    # memory:// is one database per process; start every size from an empty schema
+    drop_schema(service.engine)
+    service.setup()
+
+    batch_size = max(1, int(os.getenv('INGEST_BATCH_SIZE', 500)))
+    start = time.perf_counter()
+    for offset in range(0, size, batch_size):
+        outcome = service.add_grants(corpus[offset:offset + batch_size])
+        if not outcome['success']:
+            raise RuntimeError(f"add_grants failed: {outcome['error']}")
+    ingest_seconds = time.perf_counter() - start
+    results = [
+        result('ingest.add_grants', size, size / ingest_seconds, 'grants/s', True,
+               seconds=round(ingest_seconds, 3), batch_size=batch_size)
+    ]
+
+    timings = measure(lambda: service.get_all_grants(), repeat)
+    results.append(result('listing.get_all_grants.full', size, timings['median_ms'], 'ms', False, **timings))
+    middle_id = service.get_all_grants(limit=1, after_id=size // 2, include_total=False)['grants'][0]['id']
+    timings = measure(lambda: service.get_all_grants(after_id=middle_id, limit=100), repeat)
+    results.append(result('listing.get_all_grants.page100', size, timings['median_ms'], 'ms', False, **timings))
+
+    from tag_query import all_of
+    for label, tags, match in SEARCHES:
+        if match == 'all':
+            timings = measure(lambda: service.search_grants_by_query(all_of(tags)), repeat)
+            name = f'search.search_grants_by_query[{label}]'
+        else:
+            timings = measure(lambda: service.search_grants_by_tags(tags), repeat)
+            name = f'search.search_grants_by_tags[{label}]'
+        matches = len(service.search_grants_by_tags(tags)['grants']) if match == 'any' else None
+        results.append(result(name, size, timings['median_ms'], 'ms', False, matches=matches, **timings))
+
+    service.engine.dispose()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, backend, threshold):
+    """Print the change against a baseline run and return the regressions beyond threshold percent"""
+    previous = {(entry['benchmark'], entry['size']): entry for entry in baseline['results']}
+    regressions = []
+    print(f"\n📊 Compared with {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta'].get('timestamp')})")
+    if baseline['meta'].get('backend') != backend:
+        print(f"  ⚠️  Baseline ran on {baseline['meta'].get('backend')}, this run on {backend}")
+    for entry in results:
+        old = previous.get((entry['benchmark'], entry['size']))
+        if not old or not old['value']:
+            continue
+        change = (entry['value'] - old['value']) / old['value'] * 100
+        worse = -change if entry['higher_is_better'] else change
+        marker = '❌' if worse > threshold else ('✅' if worse < -threshold else '  ')
+        print(f"  {marker} {entry['benchmark']:<62} {entry['size']:>7}  {old['value']:>12} -> {entry['value']:>12} "
+              f"{entry['unit']:<8} {change:+.1f}%")
+        if worse > threshold:
+            regressions.append(entry)
+    return regressions
+
+
+def main():
+    """Run the suite and print, save or compare the results"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1k,10k', help='comma-separated corpus sizes, e.g. 1k,10k,100k')
+    parser.add_argument('--backend', choices=('sqlite', 'memory'), default='sqlite', help='database backend')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repetitions per latency benchmark')
+    parser.add_argument('--seed', type=int, default=42, help='corpus random seed')
+    parser.add_argument('--only', choices=('tagging', 'database'), help='run one group of benchmarks')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--fail-threshold', type=float, default=None,
+                        help='with --compare, exit non-zero if any benchmark is this many percent worse')
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    workdir = tempfile.mkdtemp(prefix='grant_bench_')
+    results = []
+    try:
+        for size in sizes:
+            corpus = generate_corpus(size, seed=args.seed)
+            print(f"🏁 {size} grants ({args.backend})")
+            size_results = []
+            if args.only in (None, 'tagging'):
+                size_results.extend(bench_tagging(corpus))
+            if args.only in (None, 'database'):
+                size_results.extend(bench_database(corpus, args.backend, workdir, args.repeat))
+            for entry in size_results:
+                print(f"  {entry['benchmark']:<62} {entry['value']:>12} {entry['unit']}")
+            results.extend(size_results)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'backend': args.backend,
+            'sizes': sizes,
+            'seed': args.seed,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.backend, args.fail_threshold or 0.0)
+        if args.fail_threshold is not None and regressions:
+            print(f"❌ {len(regressions)} benchmark(s) regressed by more than {args.fail_threshold}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
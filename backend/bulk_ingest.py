@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from models import Grant, Tag, grant_tags
+from text_utils import content_hash
+
+# Keep IN (...) lists well under every backend's bound-parameter limit
+IN_CLAUSE_CHUNK_SIZE = 1000
+
+
+def load_tag_id_map(session) -> Dict[str, int]:
+    """Load the full tag name -> id map in one query"""
+    return dict(session.query(Tag.name, Tag.id).all())
+
+
+def find_existing_grant_names(session, grant_names: Iterable[str]) -> set:
+    """Return the subset of grant_names already stored, in a few chunked queries"""
+    names = list(set(grant_names))
+    existing = set()
+    for start in range(0, len(names), IN_CLAUSE_CHUNK_SIZE):
+        chunk = names[start:start + IN_CLAUSE_CHUNK_SIZE]
+        existing.update(
+            name for (name,) in session.query(Grant.grant_name).filter(Grant.grant_name.in_(chunk))
+        )
+    return existing
+
+
+def find_existing_content_hashes(session, hashes: Iterable[str]) -> Dict[str, int]:
+    """Map each already-stored content hash to its grant id, in a few chunked queries"""
+    hashes = list(set(hashes))
+    existing = {}
+    for start in range(0, len(hashes), IN_CLAUSE_CHUNK_SIZE):
+        chunk = hashes[start:start + IN_CLAUSE_CHUNK_SIZE]
+        existing.update(session.query(Grant.content_hash, Grant.id).filter(Grant.content_hash.in_(chunk)))
+    return existing
+
+
+def split_duplicates(session, grants_data: List[Dict]) -> Tuple[List[int], List[str], Dict[str, int]]:
+    """
+    Separate new grants from ones whose content is already stored or repeated in the batch.
+
+    Returns the positions of the first copy of each new content, the content
+    hash of every grant, and the stored hash -> grant id map.
+    """
+    hashes = [content_hash(grant_data['grant_name'], grant_data['grant_description']) for grant_data in grants_data]
+    existing = find_existing_content_hashes(session, hashes)
+    new_positions = []
+    seen = set(existing)
+    for position, value in enumerate(hashes):
+        if value not in seen:
+            seen.add(value)
+            new_positions.append(position)
+    return new_positions, hashes, existing
+
+
+def _insert_grant_rows(session, rows: List[Dict]) -> List[int]:
+    """Insert grant rows in bulk and return their new IDs in input order"""
+    # Rows carry distinct content hashes, so IDs are matched back by hash rather than
+    # relying on ordered RETURNING, which SQLAlchemy can only batch with a sentinel column
+    if session.get_bind().dialect.insert_executemany_returning:
+        result = session.execute(insert(Grant).returning(Grant.content_hash, Grant.id), rows)
+        ids_by_hash = dict(result.all())
+    else:
+        # Without executemany RETURNING (e.g. MySQL) insert with one executemany, which is
+        # sent as multi-row INSERTs, then look the new IDs up by content hash
+        session.execute(insert(Grant.__table__), rows)
+        ids_by_hash = find_existing_content_hashes(session, [row['content_hash'] for row in rows])
+    return [ids_by_hash[row['content_hash']] for row in rows]
+
+
+def bulk_insert_grants(session, grants_data: List[Dict], tag_names_per_grant: List[List[str]],
+                       tag_id_map: Dict[str, int], content_hashes: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Insert grants and their tag associations with bulk statements.
+
+    Tag names missing from tag_id_map are skipped. content_hashes are
+    computed when not given; grants must not repeat stored content (see
+    split_duplicates). Returns the inserted grants in the same shape as
+    Grant.to_dict(). The caller owns the transaction.
+    """
+    if not grants_data:
+        return []
+
+    if content_hashes is None:
+        content_hashes = [
+            content_hash(grant_data['grant_name'], grant_data['grant_description']) for grant_data in grants_data
+        ]
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'grant_name': grant_data['grant_name'],
+            'grant_description': grant_data['grant_description'],
+            'content_hash': value,
+            'created_at': now,
+            'updated_at': now
+        }
+        for grant_data, value in zip(grants_data, content_hashes)
+    ]
+    grant_ids = _insert_grant_rows(session, rows)
+
+    association_rows = []
+    inserted = []
+    for grant_id, row, tag_names in zip(grant_ids, rows, tag_names_per_grant):
+        assigned = [tag_name for tag_name in dict.fromkeys(tag_names) if tag_name in tag_id_map]
+        association_rows.extend({'grant_id': grant_id, 'tag_id': tag_id_map[tag_name]} for tag_name in assigned)
+        inserted.append({
+            'id': grant_id,
+            'grant_name': row['grant_name'],
+            'grant_description': row['grant_description'],
+            'tags': assigned,
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat()
+        })
+
+    if association_rows:
+        session.execute(grant_tags.insert(), association_rows)
+
+    return inserted
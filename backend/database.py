@@ -1,8 +1,12 @@
 import os
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 from dotenv import load_dotenv
+from metrics import instrument_engine
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,12 +25,43 @@ DB_CONFIG = {
     'proxy_password': os.getenv('DB_PROXY_PASSWORD', '')
 }
 
-print(f"Database configuration loaded: {DB_CONFIG}")
+# Connection pool configuration. Serverless mode (default on Vercel) opens a
+# connection per checkout instead of keeping a pool alive between invocations.
+POOL_CONFIG = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'TRUE').upper() == 'TRUE',
+    'serverless': os.getenv(
+        'DB_SERVERLESS', 'TRUE' if os.getenv('ENVIRONMENT') == 'vercel_production' else 'FALSE'
+    ).upper() == 'TRUE'
+}
+
+# SQLite tuning applied to every new connection: WAL lets readers run alongside
+# the writer, synchronous=NORMAL makes each (batched) commit cheap, and
+# memory-mapped I/O serves reads from the page cache
+SQLITE_CONFIG = {
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 268435456)),
+    'cache_size_kb': int(os.getenv('SQLITE_CACHE_SIZE_KB', 65536)),
+    'busy_timeout_ms': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 30000))
+}
+
+# memory:// selects a process-local in-memory database
+MEMORY_URL = 'memory://'
 
 def get_database_url():
-    """Generate database URL for SQLAlchemy"""
+    """Generate database URL for SQLAlchemy (DATABASE_URL overrides the DB_* settings)"""
+    if os.getenv('DATABASE_URL'):
+        return os.getenv('DATABASE_URL')
     return f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
 
+def get_backend_name(url: str) -> str:
+    """Backend of a database URL: 'memory', 'sqlite', 'mysql', ..."""
+    if url == MEMORY_URL:
+        return 'memory'
+    return make_url(url).get_backend_name()
+
 def setup_proxy():
     """Set up SOCKS proxy if configured and enabled"""
     # Check if proxy is enabled
@@ -64,24 +99,243 @@ def setup_proxy():
         print("⚠️  Continuing without proxy...")
         return False
 
-def create_database_engine():
-    """Create database engine with optional proxy support"""
-    database_url = get_database_url()
+class PoolStats:
+    """Checkout counters and cumulative wait time for one engine's pool"""
     
-    # Set up proxy if configured
-    if not setup_proxy():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checked_out = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+    
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self.lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+    
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'checked_out': self.checked_out,
+                'waits': self.waits,
+                'wait_seconds': round(self.wait_seconds, 6),
+                'avg_wait_seconds': round(self.wait_seconds / self.waits, 6) if self.waits else 0.0,
+                'max_wait_seconds': round(self.max_wait_seconds, 6),
+                'timeouts': self.timeouts
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection"""
+    
+    stats = None
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.stats is not None:
+            self.stats.record_wait(time.perf_counter() - start)
+        return connection
+    
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+# Process-wide engines keyed by URL, so every caller shares one pool
+_engines = {}
+_pool_stats = {}
+_engines_lock = threading.Lock()
+
+def _attach_pool_stats(engine, stats: PoolStats):
+    """Count connects, checkouts and checkins through pool events"""
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        with stats.lock:
+            stats.connects += 1
+    
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with stats.lock:
+            stats.checkouts += 1
+            stats.checked_out += 1
+    
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        with stats.lock:
+            stats.checkins += 1
+            stats.checked_out -= 1
+
+class SerializedStaticPool(StaticPool):
+    """
+    StaticPool whose single connection is checked out by one thread at a time.
+    
+    A plain StaticPool hands the same connection, and with it the same
+    transaction, to every concurrent session. Here other threads wait (up to
+    timeout seconds) until it is returned, so each thread's transaction is
+    isolated; nested checkouts within one thread still share it.
+    """
+    
+    def __init__(self, creator, timeout: float = 30.0, **kwargs):
+        super().__init__(creator, **kwargs)
+        self._timeout = timeout
+        self._available = threading.Condition()
+        self._owner = None
+        self._depth = 0
+    
+    def _do_get(self):
+        thread_id = threading.get_ident()
+        with self._available:
+            if not self._available.wait_for(lambda: self._owner in (None, thread_id), timeout=self._timeout):
+                raise exc.TimeoutError(
+                    f"In-memory database connection busy for {self._timeout}s; is a session left open in another thread?"
+                )
+            self._owner = thread_id
+            self._depth += 1
+        try:
+            return super()._do_get()
+        except Exception:
+            self._release()
+            raise
+    
+    def _do_return_conn(self, record):
+        self._release()
+    
+    def _release(self):
+        with self._available:
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._available.notify()
+    
+    def recreate(self):
+        pool = super().recreate()
+        pool._timeout = self._timeout
+        return pool
+
+def get_engine_options(url: str = None) -> dict:
+    """create_engine() pool arguments for the configured pooling mode and the URL's backend"""
+    backend = get_backend_name(url) if url else 'mysql'
+    if backend == 'memory' or (backend == 'sqlite' and make_url(url).database in (None, '', ':memory:')):
+        # One connection holds the in-memory database; threads take turns using it
+        return {
+            'poolclass': SerializedStaticPool,
+            'pool_timeout': POOL_CONFIG['pool_timeout'],
+            'connect_args': {'check_same_thread': False}
+        }
+    
+    options = {}
+    if backend == 'sqlite':
+        options['connect_args'] = {'check_same_thread': False, 'timeout': SQLITE_CONFIG['busy_timeout_ms'] / 1000}
+    if POOL_CONFIG['serverless']:
+        # Short-lived invocations: no idle connections left behind between requests
+        options.update({'poolclass': NullPool, 'pool_pre_ping': POOL_CONFIG['pool_pre_ping']})
+        return options
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': POOL_CONFIG['pool_size'],
+        'max_overflow': POOL_CONFIG['max_overflow'],
+        'pool_timeout': POOL_CONFIG['pool_timeout'],
+        'pool_recycle': POOL_CONFIG['pool_recycle'],
+        'pool_pre_ping': POOL_CONFIG['pool_pre_ping']
+    })
+    return options
+
+def _tune_sqlite(engine, in_memory: bool):
+    """Apply the SQLITE_CONFIG pragmas to every new connection"""
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_CONFIG['mmap_size']}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CONFIG['cache_size_kb']}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_CONFIG['busy_timeout_ms']}")
+        cursor.close()
+
+def get_engine(url: str, name: str = None):
+    """
+    Return the shared engine for url, creating it with the configured pool on first use.
+    
+    url is any SQLAlchemy URL, or memory:// for a process-local in-memory
+    database (one per process, shared by every caller). name labels the
+    engine in get_pool_stats() and defaults to the URL without its password.
+    """
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is not None:
+            return engine
+        
+        backend = get_backend_name(url)
+        options = get_engine_options(url)
+        stats = PoolStats()
+        engine = create_engine('sqlite://' if backend == 'memory' else url, echo=False, **options)
+        if backend in ('memory', 'sqlite'):
+            _tune_sqlite(engine, in_memory=options.get('poolclass') is SerializedStaticPool)
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.stats = stats
+        _attach_pool_stats(engine, stats)
+        instrument_engine(engine)
+        
+        if name is None:
+            name = url if backend == 'memory' else make_url(url).render_as_string(hide_password=True)
+        _engines[url] = engine
+        _pool_stats[name] = (engine, stats)
+        return engine
+
+def get_pool_stats() -> dict:
+    """Checkout and wait statistics for every engine created in this process"""
+    result = {}
+    for name, (engine, stats) in list(_pool_stats.items()):
+        pool_stats = stats.to_dict()
+        pool_stats['pool'] = engine.pool.status()
+        pool_stats['serverless'] = POOL_CONFIG['serverless']
+        result[name] = pool_stats
+    return result
+
+def dispose_engines():
+    """Close every pooled connection, e.g. after forking worker processes"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+def create_database_engine(database_url: str = None):
+    """Return the shared engine for database_url (default get_database_url()) with optional proxy support"""
+    name = None if database_url else 'default'
+    database_url = database_url or get_database_url()
+    
+    # Set up proxy if configured (only MySQL connections go through it)
+    if get_backend_name(database_url) == 'mysql' and not setup_proxy():
         return None
     
-    return create_engine(database_url, echo=False)
+    return get_engine(database_url, name=name)
+
+_Session = sessionmaker()
 
 def get_db_session():
-    """Get database session"""
-    engine = create_database_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Get database session bound to the shared engine"""
+    return _Session(bind=create_database_engine())
 
 def create_server_engine():
-    """Create database engine for server connection (without database name)"""
+    """Return the shared engine for the server connection (without database name)"""
     # For creating the database, we need to connect without specifying the database name
     server_url = f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}"
     
@@ -89,12 +343,17 @@ def create_server_engine():
     if not setup_proxy():
         return None
     
-    return create_engine(server_url, echo=False)
+    return get_engine(server_url, name='server')
 
 def init_database(app):
     """Initialize database with Flask app"""
-    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
+    # Imported here so modules that only need the engine don't pay for Flask-SQLAlchemy
+    from flask_sqlalchemy import SQLAlchemy
+    
+    database_url = get_database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://' if database_url == MEMORY_URL else database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(database_url)
     
     # Set up proxy if configured
     setup_proxy()
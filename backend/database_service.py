@@ -1,21 +1,129 @@
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.mysql import match as mysql_match
+import os
+import time
 from database import create_database_engine
-from models import Grant, Tag, Base
+from migrations import run_migrations
+from profiling import profile_methods
+from models import Grant, Tag, grant_tags
+from bulk_ingest import (IN_CLAUSE_CHUNK_SIZE, bulk_insert_grants, find_existing_content_hashes, load_tag_id_map,
+                         split_duplicates)
+from result_cache import ResultCache
+from serialization import grant_rows_to_dicts
+from tag_facets import TagFacetCounts
+from tag_index import TagBitmapIndex
+from tag_query import all_of, any_of, canonical_tag_query, compile_tag_query, parse_tag_query
 from tagging_service import GrantTaggingService
+from text_search import BM25Index
 import logging
 
+@profile_methods
 class DatabaseService:
-    def __init__(self):
-        self.engine = create_database_engine()
+    # Sort keys accepted by get_all_grants; prefix with "-" for descending order
+    GRANT_SORT_COLUMNS = {
+        'id': Grant.id,
+        'grant_name': Grant.grant_name,
+        'created_at': Grant.created_at
+    }
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+    
+    def __init__(self, database_url=None, setup=True):
+        """
+        Connect to database_url: any SQLAlchemy URL, or memory:// for an
+        in-process database. Defaults to DATABASE_URL / the DB_* settings.
+        
+        No connection is opened unless setup is true, in which case setup()
+        runs immediately. Pass setup=False when the schema is managed
+        separately (setup_database.py) to keep construction cheap.
+        """
+        self.engine = create_database_engine(database_url)
         self.Session = sessionmaker(bind=self.engine)
         self.tagging_service = GrantTaggingService()
         
-        # Create tables if they don't exist
-        Base.metadata.create_all(self.engine)
+        # Cached tag name -> id map, reloaded after tag changes
+        self._tag_id_map = None
+        self._missing_tag_names = set()
+        
+        # Read results keyed by method and arguments, invalidated by writes through this service
+        self.result_cache = ResultCache.from_env()
+        
+        # Optional in-memory tag -> grant bitmap index (USE_TAG_INDEX=TRUE), built on first use
+        self.use_tag_index = os.getenv('USE_TAG_INDEX', 'FALSE').upper() == 'TRUE'
+        self.tag_index = None
+        self._tag_index_state = None
+        self.tag_index_refresh_seconds = float(os.getenv('TAG_INDEX_REFRESH_SECONDS', 0))
         
-        # Initialize default tags
+        # Tag counts and co-occurrence for facets, built on the first facet request
+        self.tag_facets = None
+        self._tag_facets_state = None
+        
+        # BM25 full-text index for backends without native full-text search, built on first use
+        self.text_index = None
+        self._text_index_state = None
+        
+        if setup:
+            self.setup()
+    
+    def setup(self):
+        """Create tables, apply pending migrations and insert the default tags; returns the migrations applied"""
+        applied = run_migrations(self.engine)
         self._initialize_default_tags()
+        return applied
+    
+    def check_connection(self):
+        """Run a trivial query; True when the database is reachable"""
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(select(1))
+            return True
+        except Exception as e:
+            logging.error(f"Database health check failed: {e}")
+            return False
+    
+    def refresh_tag_index(self):
+        """(Re)build the in-memory tag bitmap index from the database"""
+        session = self.Session()
+        try:
+            # Taken first, so writes made during the build trigger another rebuild
+            state = self._grants_table_state(session)
+            if self.tag_index is None:
+                self.tag_index = TagBitmapIndex.build(session)
+            else:
+                self.tag_index.rebuild(session)
+            self._tag_index_state = state
+            # The rebuild may include other processes' writes
+            self.result_cache.bump_generation()
+            logging.info(f"Tag index built for {len(self.tag_index.bitmaps)} tags")
+        except Exception as e:
+            logging.error(f"Error building tag index: {e}")
+            self.tag_index = None
+        finally:
+            session.close()
+    
+    def _current_tag_index(self, session):
+        """
+        The tag index, built on first use and rebuilt when the grants table
+        changed behind this process's back (e.g. the ingest worker) or the
+        index is older than TAG_INDEX_REFRESH_SECONDS.
+        """
+        if not self.use_tag_index and self.tag_index is None:
+            return None
+        if (self.tag_index is None or self._grants_table_state(session) != self._tag_index_state
+                or (self.tag_index_refresh_seconds > 0
+                    and time.monotonic() - self.tag_index.built_at > self.tag_index_refresh_seconds)):
+            self.refresh_tag_index()
+        return self.tag_index
+    
+    def _current_tag_facets(self, session):
+        """Tag counts and co-occurrence, rebuilt when the grants table changed behind this process's back"""
+        state = self._grants_table_state(session)
+        if self.tag_facets is None or state != self._tag_facets_state:
+            self.tag_facets = TagFacetCounts.build(session, state[0])
+            self._tag_facets_state = state
+        return self.tag_facets
     
     def _initialize_default_tags(self):
         """Initialize default tags if they don't exist"""
@@ -23,11 +131,12 @@ class DatabaseService:
         try:
             # Check if tags already exist
             if session.query(Tag).count() == 0:
-                default_tags = self.tagging_service.available_tags
+                default_tags = self.tagging_service.get_available_tags()
                 for tag_name in default_tags:
                     tag = Tag(name=tag_name)
                     session.add(tag)
                 session.commit()
+                self.invalidate_tag_cache()
                 logging.info(f"Initialized {len(default_tags)} default tags")
         except Exception as e:
             logging.error(f"Error initializing default tags: {e}")
@@ -35,61 +144,178 @@ class DatabaseService:
         finally:
             session.close()
     
+    def invalidate_tag_cache(self):
+        """Forget the cached tag name -> id map after tags change"""
+        self._tag_id_map = None
+        self._missing_tag_names = set()
+        self.result_cache.bump_generation()
+    
+    def _get_tag_id_map(self, session, tag_names=()):
+        """Return the cached tag name -> id map, reloading it if a tag is unknown"""
+        unknown = set(tag_names) - self._missing_tag_names
+        if self._tag_id_map is None or not unknown.issubset(self._tag_id_map):
+            self._tag_id_map = load_tag_id_map(session)
+            # Remember names that really do not exist so they don't force a reload every call
+            self._missing_tag_names |= unknown - set(self._tag_id_map)
+        return self._tag_id_map
+    
     def add_grants(self, grants_data):
-        """Add new grants to the database"""
-        session = self.Session()
+        """
+        Add new grants to the database.
+        
+        Grants whose name and description (normalized) are already stored,
+        or repeated earlier in the batch, are skipped and listed under
+        'duplicates' with the index of the input grant and the existing id.
+        """
+        session = None
         try:
-            added_grants = []
+            # Drop content that is already stored before spending any tagging work on it,
+            # in a short session of its own so no connection is held while tagging
+            lookup_session = self.Session()
+            try:
+                new_positions, hashes, grant_ids_by_hash = split_duplicates(lookup_session, grants_data)
+            finally:
+                lookup_session.close()
+            
+            # Tag the whole batch (including any LLM calls) before opening the write transaction
+            assigned_tags_batch = self.tagging_service.assign_tags_batch(
+                [grants_data[position] for position in new_positions]
+            )
+            assigned_tags = dict(zip(new_positions, assigned_tags_batch))
             
-            for grant_data in grants_data:
-                # Create grant
-                grant = Grant(
-                    grant_name=grant_data['grant_name'],
-                    grant_description=grant_data['grant_description']
+            session = self.Session()
+            
+            def write(positions):
+                """Insert grants and grant_tags rows with bulk statements and commit"""
+                tag_id_map = self._get_tag_id_map(
+                    session, {tag_name for position in positions for tag_name in assigned_tags[position]}
                 )
-                session.add(grant)
-                session.flush()  # Get the ID
-                
-                # Get assigned tags
-                assigned_tags = self.tagging_service.assign_tags(
-                    grant_data['grant_name'], 
-                    grant_data['grant_description']
+                added = bulk_insert_grants(
+                    session, [grants_data[position] for position in positions],
+                    [assigned_tags[position] for position in positions], tag_id_map,
+                    content_hashes=[hashes[position] for position in positions]
                 )
-                
-                # Find and assign tags
-                for tag_name in assigned_tags:
-                    tag = session.query(Tag).filter(Tag.name == tag_name).first()
-                    if tag:
-                        grant.tags.append(tag)
-                
-                added_grants.append(grant.to_dict())
-            
-            session.commit()
+                session.commit()
+                return added
+            
+            try:
+                added_grants = write(new_positions)
+            except IntegrityError:
+                # Another writer stored some of this content since the lookup; report it as duplicate
+                session.rollback()
+                stored = find_existing_content_hashes(session, [hashes[position] for position in new_positions])
+                if not stored:
+                    raise
+                grant_ids_by_hash.update(stored)
+                new_positions = [position for position in new_positions if hashes[position] not in stored]
+                added_grants = write(new_positions)
+            self.result_cache.bump_generation()
+            
+            if self.tag_index is not None or self.tag_facets is not None or self.text_index is not None:
+                state = self._grants_table_state(session)
+                if self.tag_index is not None:
+                    self.tag_index.add_grants((grant['id'], grant['tags']) for grant in added_grants)
+                    self._tag_index_state = state
+                if self.tag_facets is not None:
+                    for grant in added_grants:
+                        self.tag_facets.add_grant(grant['tags'])
+                    self._tag_facets_state = state
+                if self.text_index is not None:
+                    for grant in added_grants:
+                        self.text_index.add_document(grant['id'], f"{grant['grant_name']} {grant['grant_description']}")
+                    self._text_index_state = state
+            
+            grant_ids_by_hash.update(
+                (hashes[position], grant['id']) for position, grant in zip(new_positions, added_grants)
+            )
+            added_positions = set(new_positions)
+            duplicates = [
+                {'index': position, 'existing_id': grant_ids_by_hash[hashes[position]]}
+                for position in range(len(grants_data)) if position not in added_positions
+            ]
+            
+            message = f'Successfully added {len(added_grants)} grant(s)'
+            if duplicates:
+                message += f', skipped {len(duplicates)} duplicate(s)'
             return {
                 'success': True,
                 'grants_added': added_grants,
-                'message': f'Successfully added {len(added_grants)} grant(s)'
+                'duplicates': duplicates,
+                'message': message
             }
             
         except Exception as e:
-            session.rollback()
+            if session is not None:
+                session.rollback()
             logging.error(f"Error adding grants: {e}")
             return {
                 'success': False,
                 'error': str(e)
             }
         finally:
-            session.close()
+            if session is not None:
+                session.close()
+    
+    def get_all_grants(self, after_id=None, limit=None, sort='id', fields=None, include_total=True):
+        """
+        Get grants from the database.
+        
+        Without after_id or limit every grant is returned. Otherwise results
+        are keyset-paginated: pass the previous page's next_after_id as
+        after_id to continue. fields restricts the returned keys (the id is
+        always included) and include_total=False skips the COUNT query.
+        """
+        key = ('grants', after_id, limit, sort, tuple(fields) if fields is not None else None, include_total)
+        return self.result_cache.get_or_compute(
+            key, lambda: self._get_all_grants(after_id, limit, sort, fields, include_total)
+        )
     
-    def get_all_grants(self):
-        """Get all grants from the database"""
+    def _get_all_grants(self, after_id, limit, sort, fields, include_total):
         session = self.Session()
         try:
-            grants = session.query(Grant).all()
-            return {
+            descending = sort.startswith('-')
+            sort_column = self.GRANT_SORT_COLUMNS[sort.lstrip('-')]
+            paginated = after_id is not None or limit is not None
+            if paginated:
+                limit = min(limit or self.DEFAULT_PAGE_SIZE, self.MAX_PAGE_SIZE)
+            
+            # Fetch only the requested columns as plain rows, and tags only when asked for
+            fields = self._normalize_fields(fields)
+            query = session.query(*self._grant_columns(fields))
+            
+            if after_id is not None:
+                condition = self._keyset_condition(session, sort_column, descending, after_id)
+                if condition is None:
+                    return {
+                        'success': False,
+                        'error': f"Unknown after_id: {after_id}",
+                        'invalid_request': True
+                    }
+                query = query.filter(condition)
+            
+            query = query.order_by(self._sort_order(session, sort_column, descending),
+                                   Grant.id.desc() if descending else Grant.id.asc())
+            
+            next_after_id = None
+            if paginated:
+                # Fetch one extra row to know whether another page exists
+                rows = query.limit(limit + 1).all()
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_after_id = rows[-1].id
+                grant_ids = [row.id for row in rows]
+            else:
+                rows = query.all()
+                grant_ids = None
+            
+            result = {
                 'success': True,
-                'grants': [grant.to_dict() for grant in grants]
+                'grants': self._rows_to_grant_dicts(session, rows, fields, grant_ids=grant_ids),
+                'next_after_id': next_after_id
             }
+            if include_total:
+                result['total'] = len(rows) if not paginated else session.query(func.count(Grant.id)).scalar()
+            return result
         except Exception as e:
             logging.error(f"Error getting grants: {e}")
             return {
@@ -99,15 +325,90 @@ class DatabaseService:
         finally:
             session.close()
     
-    def get_all_tags(self):
-        """Get all available tags"""
+    @staticmethod
+    def _normalize_fields(fields):
+        """Requested fields in output order, always including the id"""
+        if fields is None:
+            return list(Grant.DICT_FIELDS)
+        return [field for field in Grant.DICT_FIELDS if field == 'id' or field in fields]
+    
+    @staticmethod
+    def _grant_columns(fields):
+        return [getattr(Grant, field) for field in fields if field != 'tags']
+    
+    def _rows_to_grant_dicts(self, session, rows, fields, grant_ids=None, grant_filter=None):
+        """
+        Turn grant row tuples into Grant.to_dict()-shaped dicts.
+        
+        Tags are loaded as (grant_id, name) rows: by id when grant_ids is
+        given, through grant_filter (a clause on Grant) when that is given,
+        and for every grant otherwise.
+        """
+        tag_names_by_grant = None
+        if 'tags' in fields:
+            tag_names_by_grant = {}
+            tag_rows = session.query(grant_tags.c.grant_id, Tag.name).join(Tag, Tag.id == grant_tags.c.tag_id)
+            if grant_ids is not None:
+                for start in range(0, len(grant_ids), IN_CLAUSE_CHUNK_SIZE):
+                    chunk = grant_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+                    for grant_id, tag_name in tag_rows.filter(grant_tags.c.grant_id.in_(chunk)):
+                        tag_names_by_grant.setdefault(grant_id, []).append(tag_name)
+            else:
+                if grant_filter is not None:
+                    tag_rows = tag_rows.filter(grant_tags.c.grant_id.in_(select(Grant.id).where(grant_filter)))
+                for grant_id, tag_name in tag_rows:
+                    tag_names_by_grant.setdefault(grant_id, []).append(tag_name)
+        
+        return grant_rows_to_dicts(rows, fields, tag_names_by_grant)
+    
+    @staticmethod
+    def _sort_order(session, sort_column, descending):
+        """
+        ORDER BY term for sort_column with NULLs lowest: first ascending, last descending.
+        
+        That is the native order on MySQL and SQLite (which reject NULLS FIRST/LAST),
+        so it is only spelled out for other backends.
+        """
+        order = sort_column.desc() if descending else sort_column.asc()
+        if sort_column.nullable and session.get_bind().dialect.name not in ('mysql', 'sqlite'):
+            order = order.nulls_last() if descending else order.nulls_first()
+        return order
+    
+    def _keyset_condition(self, session, sort_column, descending, after_id):
+        """Filter selecting rows that sort after the grant with id after_id, or None if it does not exist"""
+        if sort_column is Grant.id:
+            return Grant.id < after_id if descending else Grant.id > after_id
+        
+        # Ties on the sort column are broken by id
+        anchor = session.query(sort_column).filter(Grant.id == after_id).first()
+        if anchor is None:
+            return None
+        value = anchor[0]
+        
+        # NULLs sort lowest (see _sort_order) and never compare equal, so they are matched explicitly
+        if value is None:
+            if descending:
+                return and_(sort_column.is_(None), Grant.id < after_id)
+            return or_(sort_column.isnot(None), and_(sort_column.is_(None), Grant.id > after_id))
+        if descending:
+            return or_(sort_column < value, and_(sort_column == value, Grant.id < after_id), sort_column.is_(None))
+        return or_(sort_column > value, and_(sort_column == value, Grant.id > after_id))
+    
+    def get_all_tags(self, with_counts=False):
+        """Get all available tags, optionally with the number of grants per tag"""
+        return self.result_cache.get_or_compute(('tags', with_counts), lambda: self._get_all_tags(with_counts))
+    
+    def _get_all_tags(self, with_counts):
         session = self.Session()
         try:
             tags = session.query(Tag).all()
-            return {
+            result = {
                 'success': True,
                 'tags': [tag.name for tag in tags]
             }
+            if with_counts:
+                result['counts'], _ = self._facet_counts(session, result['tags'], [])
+            return result
         except Exception as e:
             logging.error(f"Error getting tags: {e}")
             return {
@@ -117,21 +418,105 @@ class DatabaseService:
         finally:
             session.close()
     
+    def get_tag_facets(self, selected_tags=None):
+        """
+        Count, for every predefined tag, the grants that have it together
+        with all of selected_tags.
+        """
+        session = self.Session()
+        try:
+            selected = list(dict.fromkeys(selected_tags or []))
+            counts, total = self._facet_counts(session, self.tagging_service.get_available_tags(), selected)
+            return {
+                'success': True,
+                'facets': counts,
+                'selected': selected,
+                'total': total
+            }
+        except Exception as e:
+            logging.error(f"Error getting tag facets: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        finally:
+            session.close()
+    
+    def _facet_counts(self, session, tag_names, selected):
+        """Return ({tag: count within selection}, size of selection)"""
+        # No selection or a single tag: read the precomputed counts and co-occurrence
+        if len(selected) <= 1:
+            tag_facets = self._current_tag_facets(session)
+            selected_tag = selected[0] if selected else None
+            return tag_facets.facet_counts(tag_names, selected_tag), tag_facets.matching_count(selected_tag)
+        
+        # Larger selections: intersect bitmaps and count bits
+        tag_index = self._current_tag_index(session)
+        if tag_index is not None:
+            selection = tag_index.evaluate(all_of(selected))
+            return ({tag_name: TagBitmapIndex.count(selection & tag_index.bitmaps.get(tag_name, 0))
+                     for tag_name in tag_names},
+                    TagBitmapIndex.count(selection))
+        
+        # No in-memory index: one GROUP BY over the selected grants' tags
+        count_query = session.query(Tag.name, func.count(grant_tags.c.grant_id)).join(
+            grant_tags, grant_tags.c.tag_id == Tag.id
+        ).filter(Tag.name.in_(tag_names)).group_by(Tag.name)
+        selection_filter = compile_tag_query(all_of(selected))
+        count_query = count_query.filter(grant_tags.c.grant_id.in_(session.query(Grant.id).filter(selection_filter)))
+        total_query = session.query(func.count(Grant.id)).filter(selection_filter)
+        
+        counts = dict(count_query.all())
+        return {tag_name: counts.get(tag_name, 0) for tag_name in tag_names}, total_query.scalar()
+    
     def search_grants_by_tags(self, search_tags):
-        """Search grants by tags"""
+        """Search grants that have any of the given tags"""
+        if not search_tags:
+            return self.get_all_grants()
+        
+        return self._search_grants(any_of(search_tags))
+    
+    def search_grants_by_query(self, tag_query):
+        """
+        Search grants with a boolean tag expression.
+        
+        tag_query is either an expression string such as
+        "(water AND drought) AND NOT flood" or an already parsed tree.
+        Raises TagQueryError for malformed expressions.
+        """
+        if isinstance(tag_query, str):
+            tag_query = parse_tag_query(tag_query)
+        
+        return self._search_grants(tag_query)
+    
+    def _search_grants(self, tag_query):
+        """Run a parsed tag query against the bitmap index if enabled, otherwise in SQL"""
+        return self.result_cache.get_or_compute(
+            ('search', canonical_tag_query(tag_query)), lambda: self._run_tag_search(tag_query)
+        )
+    
+    def _run_tag_search(self, tag_query):
         session = self.Session()
         try:
-            if not search_tags:
-                return self.get_all_grants()
-            
-            # Build query to find grants that have any of the specified tags
-            grants = session.query(Grant).join(Grant.tags).filter(
-                Tag.name.in_(search_tags)
-            ).distinct().all()
+            fields = list(Grant.DICT_FIELDS)
+            columns = self._grant_columns(fields)
+            tag_index = self._current_tag_index(session)
+            if tag_index is not None:
+                # Matching ids come from memory; rows are fetched by primary key
+                grant_ids = tag_index.search(tag_query)
+                rows = []
+                for start in range(0, len(grant_ids), IN_CLAUSE_CHUNK_SIZE):
+                    chunk = grant_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+                    rows.extend(session.query(*columns).filter(Grant.id.in_(chunk)).order_by(Grant.id))
+                grants = self._rows_to_grant_dicts(session, rows, fields, grant_ids=grant_ids)
+            else:
+                grant_filter = compile_tag_query(tag_query)
+                rows = session.query(*columns).filter(grant_filter).all()
+                grants = self._rows_to_grant_dicts(session, rows, fields, grant_filter=grant_filter)
             
             return {
                 'success': True,
-                'grants': [grant.to_dict() for grant in grants]
+                'grants': grants
             }
         except Exception as e:
             logging.error(f"Error searching grants: {e}")
@@ -142,11 +527,118 @@ class DatabaseService:
         finally:
             session.close()
     
+    def search_grants_fulltext(self, text, tag_query=None, limit=20, offset=0):
+        """
+        Ranked full-text search over grant names and descriptions.
+        
+        Uses the MySQL FULLTEXT index when available and an in-process BM25
+        index otherwise. tag_query (a parsed tree) further restricts results.
+        Each returned grant carries a relevance 'score'.
+        """
+        key = ('fulltext', text, canonical_tag_query(tag_query), limit, offset)
+        return self.result_cache.get_or_compute(
+            key, lambda: self._search_grants_fulltext(text, tag_query, limit, offset)
+        )
+    
+    def _search_grants_fulltext(self, text, tag_query, limit, offset):
+        session = self.Session()
+        try:
+            if session.get_bind().dialect.name == 'mysql':
+                scored, total = self._fulltext_mysql(session, text, tag_query, limit, offset)
+            else:
+                scored, total = self._fulltext_bm25(session, text, tag_query, limit, offset)
+            
+            grants = []
+            for grant, score in scored:
+                grant_data = grant.to_dict()
+                grant_data['score'] = round(float(score), 4)
+                grants.append(grant_data)
+            
+            return {
+                'success': True,
+                'grants': grants,
+                'total': total
+            }
+        except Exception as e:
+            logging.error(f"Error in full-text search: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        finally:
+            session.close()
+    
+    def _fulltext_mysql(self, session, text, tag_query, limit, offset):
+        """Rank with MATCH ... AGAINST on the FULLTEXT index"""
+        score = mysql_match(Grant.grant_name, Grant.grant_description, against=text).in_natural_language_mode()
+        filters = [score > 0]
+        if tag_query is not None:
+            filters.append(compile_tag_query(tag_query))
+        
+        total = session.query(func.count(Grant.id)).filter(*filters).scalar()
+        rows = session.query(Grant, score).options(selectinload(Grant.tags)).filter(*filters).order_by(
+            score.desc(), Grant.id
+        ).offset(offset).limit(limit).all()
+        return rows, total
+    
+    def _fulltext_bm25(self, session, text, tag_query, limit, offset):
+        """Rank with the in-process BM25 index, then apply the tag filter"""
+        ranked = self._current_text_index(session).search(text)
+        
+        if tag_query is not None and ranked:
+            tag_index = self._current_tag_index(session)
+            if tag_index is not None:
+                allowed = tag_index.evaluate(tag_query)
+                ranked = [(grant_id, score) for grant_id, score in ranked if allowed >> grant_id & 1]
+            else:
+                allowed = set()
+                ranked_ids = [grant_id for grant_id, _ in ranked]
+                for start in range(0, len(ranked_ids), IN_CLAUSE_CHUNK_SIZE):
+                    chunk = ranked_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+                    allowed.update(grant_id for (grant_id,) in session.query(Grant.id).filter(
+                        Grant.id.in_(chunk), compile_tag_query(tag_query)
+                    ))
+                ranked = [(grant_id, score) for grant_id, score in ranked if grant_id in allowed]
+        
+        page = ranked[offset:offset + limit]
+        scores = dict(page)
+        grants = self._load_grants_by_ids(session, [grant_id for grant_id, _ in page])
+        return [(grant, scores[grant.id]) for grant in grants], len(ranked)
+    
+    def _grants_table_state(self, session):
+        """Cheap fingerprint of the grants table: (row count, highest id)"""
+        return tuple(session.query(func.count(Grant.id), func.max(Grant.id)).one())
+    
+    def _current_text_index(self, session):
+        """The BM25 index, rebuilt when the grants table changed behind this process's back"""
+        state = self._grants_table_state(session)
+        if self.text_index is None or state != self._text_index_state:
+            text_index = BM25Index()
+            for grant_id, grant_name, grant_description in session.query(
+                Grant.id, Grant.grant_name, Grant.grant_description
+            ).yield_per(10000):
+                text_index.add_document(grant_id, f"{grant_name} {grant_description}")
+            self.text_index = text_index
+            self._text_index_state = state
+        return self.text_index
+    
+    def _load_grants_by_ids(self, session, grant_ids):
+        """Load grants with their tags by primary key, in the order given"""
+        grants = []
+        for start in range(0, len(grant_ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = grant_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            grants_by_id = {
+                grant.id: grant
+                for grant in session.query(Grant).options(selectinload(Grant.tags)).filter(Grant.id.in_(chunk))
+            }
+            grants.extend(grants_by_id[grant_id] for grant_id in chunk if grant_id in grants_by_id)
+        return grants
+    
     def get_grant_by_id(self, grant_id):
         """Get a specific grant by ID"""
         session = self.Session()
         try:
-            grant = session.query(Grant).filter(Grant.id == grant_id).first()
+            grant = session.query(Grant).options(selectinload(Grant.tags)).filter(Grant.id == grant_id).first()
             if grant:
                 return {
                     'success': True,
@@ -172,8 +664,21 @@ class DatabaseService:
         try:
             grant = session.query(Grant).filter(Grant.id == grant_id).first()
             if grant:
+                tag_names = [tag.name for tag in grant.tags]
                 session.delete(grant)
                 session.commit()
+                self.result_cache.bump_generation()
+                if self.tag_index is not None or self.tag_facets is not None or self.text_index is not None:
+                    state = self._grants_table_state(session)
+                    if self.tag_index is not None:
+                        self.tag_index.remove_grant(grant_id, tag_names)
+                        self._tag_index_state = state
+                    if self.tag_facets is not None:
+                        self.tag_facets.remove_grant(tag_names)
+                        self._tag_facets_state = state
+                    if self.text_index is not None:
+                        self.text_index.remove_document(grant_id)
+                        self._text_index_state = state
                 return {
                     'success': True,
                     'message': 'Grant deleted successfully'
@@ -0,0 +1,158 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Dict, List, Optional
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'jobs.sqlite3')
+
+
+class JobQueue:
+    """
+    Persistent job queue stored in a local SQLite file.
+
+    No broker is needed: the API process enqueues jobs and any number of
+    worker processes claim them. Claims run inside BEGIN IMMEDIATE so two
+    workers never take the same job, and every operation opens its own
+    short-lived connection, which keeps the queue safe across processes.
+
+    Each claim issues a new lease token. Progress, heartbeat, complete and
+    fail only apply while the caller still holds the job's lease, so a worker
+    whose job was requeued as stale can no longer overwrite the new owner's
+    state; those calls return False and the worker should stop.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "kind TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "total INTEGER NOT NULL DEFAULT 0, "
+                "processed INTEGER NOT NULL DEFAULT 0, "
+                "result TEXT, "
+                "error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker TEXT, "
+                "lease TEXT, "
+                "created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            columns = {row['name'] for row in connection.execute("PRAGMA table_info(jobs)")}
+            if 'lease' not in columns:
+                # Queue files created before leases were added
+                connection.execute("ALTER TABLE jobs ADD COLUMN lease TEXT")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_id ON jobs (status, id)")
+
+    @classmethod
+    def from_env(cls) -> 'JobQueue':
+        """Open the queue at JOB_QUEUE_PATH (defaults to data/jobs.sqlite3)"""
+        return cls(os.getenv('JOB_QUEUE_PATH') or DEFAULT_QUEUE_PATH)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return closing(connection)
+
+    def enqueue(self, kind: str, payload: List[Dict]) -> int:
+        """Add a job and return its ID"""
+        now = time.time()
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO jobs (kind, status, payload, total, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (kind, json.dumps(payload), len(payload), now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """Atomically take the oldest queued job, or return None; the job carries its lease token"""
+        lease = uuid.uuid4().hex
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (worker, lease, time.time(), row['id'])
+            )
+            connection.execute("COMMIT")
+
+        job = self._row_to_dict(row)
+        job['payload'] = json.loads(row['payload'])
+        job['status'] = 'running'
+        job['lease'] = lease
+        return job
+
+    def _update_leased(self, job_id: int, lease: str, assignments: str, params: tuple) -> bool:
+        """Apply an UPDATE to a running job only while lease still owns it"""
+        assignments = f"{assignments}, updated_at = ?" if assignments else "updated_at = ?"
+        with self._connect() as connection:
+            cursor = connection.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND lease = ? AND status = 'running'",
+                params + (time.time(), job_id, lease)
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: int, lease: str) -> bool:
+        """Show that the job's worker is still alive; False if the lease was lost"""
+        return self._update_leased(job_id, lease, "", ())
+
+    def update_progress(self, job_id: int, lease: str, processed: int, result: Dict = None) -> bool:
+        """Record how many items of a running job are done, with the partial result"""
+        return self._update_leased(
+            job_id, lease, "processed = ?, result = ?",
+            (processed, json.dumps(result) if result is not None else None)
+        )
+
+    def complete(self, job_id: int, lease: str, result: Dict) -> bool:
+        """Mark a job finished with its result"""
+        return self._update_leased(
+            job_id, lease, "status = 'completed', processed = total, result = ?, lease = NULL",
+            (json.dumps(result),)
+        )
+
+    def fail(self, job_id: int, lease: str, error: str, result: Dict = None) -> bool:
+        """Mark a job failed, keeping any partial result"""
+        return self._update_leased(
+            job_id, lease, "status = 'failed', error = ?, result = ?, lease = NULL",
+            (error, json.dumps(result) if result is not None else None)
+        )
+
+    def requeue_stale(self, timeout_seconds: float) -> int:
+        """Put running jobs whose worker stopped heartbeating back in the queue, revoking their lease"""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, lease = NULL, updated_at = ? "
+                "WHERE status = 'running' AND updated_at < ?",
+                (time.time(), time.time() - timeout_seconds)
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        """Return a job's status, progress and result (without its payload)"""
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT id, kind, status, total, processed, result, error, attempts, worker, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        job = {key: row[key] for key in row.keys() if key != 'payload'}
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        return job
+
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from text_utils import content_hash
+
+
+def make_cache_key(grant_name: str, grant_description: str, vocabulary_version: str, model: str) -> str:
+    """Cache key covering the grant content, the tag vocabulary and the model"""
+    raw = f"{model}\x1f{vocabulary_version}\x1f{content_hash(grant_name, grant_description)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TagResultCache:
+    """
+    Two-level cache of LLM tag results.
+
+    An in-process LRU holds the hottest entries; an optional SQLite file
+    keeps results across restarts. Lookups that miss memory but hit disk are
+    promoted back into the LRU. Safe to share between pipeline threads.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries: "OrderedDict[str, List[str]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.connection = None
+        if path:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_tag_cache ("
+                "cache_key TEXT PRIMARY KEY, tags TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.connection.commit()
+
+    @classmethod
+    def from_env(cls) -> 'TagResultCache':
+        """Build a cache from LLM_CACHE_SIZE and LLM_CACHE_PATH"""
+        return cls(
+            max_entries=int(os.getenv('LLM_CACHE_SIZE', 1024)),
+            path=os.getenv('LLM_CACHE_PATH') or None
+        )
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached tags for key, or None on a miss"""
+        with self.lock:
+            tags = self.entries.get(key)
+            if tags is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return list(tags)
+
+            if self.connection is not None:
+                row = self.connection.execute(
+                    "SELECT tags FROM llm_tag_cache WHERE cache_key = ?", (key,)
+                ).fetchone()
+                if row:
+                    tags = json.loads(row[0])
+                    self._remember(key, tags)
+                    self.disk_hits += 1
+                    return list(tags)
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, tags: List[str]):
+        """Store tags for key in memory and, if configured, on disk"""
+        with self.lock:
+            self._remember(key, list(tags))
+            if self.connection is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO llm_tag_cache (cache_key, tags, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(tags), time.time())
+                )
+                self.connection.commit()
+
+    def _remember(self, key: str, tags: List[str]):
+        """Insert into the LRU layer, evicting the least recently used entry"""
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = tags
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached result and reset the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM llm_tag_cache")
+                self.connection.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'persistent': self.connection is not None
+            }
@@ -0,0 +1,119 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        # A rate of zero or less disables limiting
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Rate limits, timeouts, connection failures and 5xx replies are worth retrying"""
+    try:
+        import openai
+    except ImportError:
+        openai = None
+
+    if openai is not None:
+        # APITimeoutError is a subclass of APIConnectionError
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code >= 500
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+def call_with_retry(func: Callable[[], R], max_retries: int, backoff: float, max_backoff: float = 30.0,
+                    retryable: Callable[[Exception], bool] = is_transient_error) -> R:
+    """Call func, retrying transient failures with exponential backoff and jitter"""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            # Auth, bad-request and parse errors fail the same way on every attempt
+            if attempt >= max_retries or not retryable(e):
+                raise
+            delay = min(max_backoff, backoff * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+class LLMTaggingPipeline:
+    """
+    Runs LLM tagging requests on a bounded thread pool.
+
+    Every request waits for a token from the shared rate limiter; transient
+    failures (rate limits, timeouts, 5xx) are retried with exponential
+    backoff. Results come back in input order; an item whose retries are
+    exhausted yields the fallback value instead of failing the whole batch.
+    """
+
+    def __init__(self, max_concurrency: int = 8, requests_per_second: float = 0,
+                 max_retries: int = 3, backoff: float = 0.5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    @classmethod
+    def from_env(cls) -> 'LLMTaggingPipeline':
+        """Build a pipeline from the LLM_* environment variables"""
+        return cls(
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 8)),
+            requests_per_second=float(os.getenv('LLM_REQUESTS_PER_SECOND', 0)),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', 3)),
+            backoff=float(os.getenv('LLM_RETRY_BACKOFF', 0.5))
+        )
+
+    def run(self, func: Callable[[T], R], items: List[T], fallback: R = None) -> List[R]:
+        """Apply func to every item concurrently and return the results in order"""
+        def task(item):
+            def attempt():
+                self.rate_limiter.acquire()
+                return func(item)
+
+            try:
+                return call_with_retry(attempt, self.max_retries, self.backoff)
+            except Exception as e:
+                print(f"LLM tagging failed: {e}")
+                return fallback
+
+        if not items:
+            return []
+        if len(items) == 1 or self.max_concurrency == 1:
+            return [task(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as executor:
+            return list(executor.map(task, items))
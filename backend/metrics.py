@@ -0,0 +1,209 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues) -> str:
+    if not labelnames:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)) + '}'
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: Dict[tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self.values: Dict[tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        position = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][position] += 1
+            state[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        labelnames = self.labelnames + ('le',)
+        with self.lock:
+            for key, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(labelnames, key + (_format_value(bound),))} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics rendered in the Prometheus text exposition format.
+
+    Counters and histograms are updated as events happen; collectors are
+    called at scrape time for values read from other components (caches,
+    connection pools). Each process keeps its own numbers.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors: List[Callable[[], List[Tuple[str, str, str, List[Tuple[dict, float]]]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, str, List[Tuple[dict, float]]]]]):
+        """Register a callable returning [(name, type, help, [(labels, value), ...]), ...]"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'grant_api_requests_total', 'HTTP requests by route, method and status', ('route', 'method', 'status')
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    'grant_api_request_duration_seconds', 'HTTP request latency by route and method', ('route', 'method')
+)
+DB_QUERIES = REGISTRY.counter('grant_db_queries_total', 'SQL statements executed')
+DB_QUERY_LATENCY = REGISTRY.histogram('grant_db_query_duration_seconds', 'SQL statement execution time')
+TAGGING_PHASE_LATENCY = REGISTRY.histogram(
+    'grant_tagging_phase_duration_seconds', 'Time spent per tagging call in each phase', ('phase',)
+)
+
+
+class RequestTimings:
+    """Timing breakdown collected while serving one request"""
+
+    __slots__ = ('started', 'db_queries', 'db_seconds', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.phases: Dict[str, float] = {}
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (durations in milliseconds)"""
+        parts = [f'app;dur={(time.perf_counter() - self.started) * 1000:.1f}',
+                 f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"']
+        parts.extend(f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in self.phases.items())
+        return ', '.join(parts)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+
+def start_request():
+    """Begin collecting timings for the current request; returns a token for end_request()"""
+    return _current_timings.set(RequestTimings())
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+def end_request(token):
+    _current_timings.reset(token)
+
+
+def record_phase(phase: str, seconds: float):
+    """Record time spent in a named phase (e.g. rule or LLM tagging)"""
+    TAGGING_PHASE_LATENCY.observe(seconds, phase=phase)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.phases[phase] = timings.phases.get(phase, 0.0) + seconds
+
+
+def instrument_engine(engine):
+    """Count and time every SQL statement run on engine, globally and per request"""
+    if engine.__dict__.get('_grant_metrics_instrumented'):
+        return
+    engine._grant_metrics_instrumented = True
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('query_start_times')
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        DB_QUERIES.inc()
+        DB_QUERY_LATENCY.observe(elapsed)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.db_queries += 1
+            timings.db_seconds += elapsed
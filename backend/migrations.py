@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the Grant Tagging System.
+
+Applied versions are recorded in the schema_migrations table and every
+migration is idempotent, so databases created by the old create_all()
+setup are brought up to date the same way as fresh ones.
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied and pending migrations
+"""
+
+import logging
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, bindparam, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import Base, Grant, grant_tags
+from text_utils import content_hash
+
+# Rows read and updated per round trip while backfilling
+BACKFILL_BATCH_SIZE = 5000
+
+schema_migrations = Table(
+    'schema_migrations',
+    MetaData(),
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+def _ensure_index(connection, index):
+    """
+    Create a declared index unless an equivalent one already exists.
+    
+    An existing index on the same columns only stands in for a unique index
+    if it is unique too (a unique constraint also counts). An index with the
+    declared name but weaker uniqueness is dropped and recreated.
+    """
+    columns = [column.name for column in index.columns]
+    inspector = inspect(connection)
+    for existing in inspector.get_indexes(index.table.name):
+        covers = existing['column_names'] == columns and (existing['unique'] or not index.unique)
+        if existing['name'] == index.name:
+            if covers:
+                return
+            # DROP INDEX only needs the name and table, which the declared index shares
+            index.drop(connection)
+        elif covers:
+            return
+    if index.unique:
+        for constraint in inspector.get_unique_constraints(index.table.name):
+            if constraint['column_names'] == columns:
+                return
+    index.create(connection)
+
+
+def _declared_index(table, name):
+    return next(index for index in table.indexes if index.name == name)
+
+
+def _create_tables(connection):
+    """Create any missing tables (with their current columns and indexes)"""
+    Base.metadata.create_all(connection)
+
+
+def _add_lookup_indexes(connection):
+    """Index grant names (dedupe), creation time (recency sorts) and tag -> grant lookups"""
+    _ensure_index(connection, _declared_index(Grant.__table__, 'ix_grants_grant_name'))
+    _ensure_index(connection, _declared_index(Grant.__table__, 'ix_grants_created_at'))
+    # MySQL already backs the tag_id foreign key with an index of its own
+    _ensure_index(connection, _declared_index(grant_tags, 'ix_grant_tags_tag_id'))
+
+
+def _add_fulltext_index(connection):
+    """FULLTEXT index over grant names and descriptions (MySQL only)"""
+    if connection.dialect.name == 'mysql':
+        _ensure_index(connection, _declared_index(Grant.__table__, 'ix_grants_fulltext'))
+
+
+def _add_content_hash(connection):
+    """
+    Add the content_hash column, backfill it and make it unique.
+
+    The lowest id keeps the hash when several grants share the same
+    content; later copies are left NULL.
+    """
+    grants_table = Grant.__table__
+    if 'content_hash' not in {column['name'] for column in inspect(connection).get_columns('grants')}:
+        connection.exec_driver_sql("ALTER TABLE grants ADD COLUMN content_hash VARCHAR(64) NULL")
+
+    seen = {value for (value,) in connection.execute(
+        select(grants_table.c.content_hash).where(grants_table.c.content_hash.is_not(None))
+    )}
+    set_hash = update(grants_table).where(grants_table.c.id == bindparam('grant_id')).values(
+        content_hash=bindparam('hash')
+    )
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(grants_table.c.id, grants_table.c.grant_name, grants_table.c.grant_description)
+            .where(grants_table.c.id > last_id, grants_table.c.content_hash.is_(None))
+            .order_by(grants_table.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        updates = []
+        for grant_id, grant_name, grant_description in rows:
+            value = content_hash(grant_name, grant_description)
+            if value not in seen:
+                seen.add(value)
+                updates.append({'grant_id': grant_id, 'hash': value})
+        if updates:
+            connection.execute(set_hash, updates)
+
+    _ensure_index(connection, _declared_index(grants_table, 'ux_grants_content_hash'))
+
+
+# (version, name, migration) in the order they must run; never renumber applied entries
+MIGRATIONS = [
+    (1, 'create_tables', _create_tables),
+    (2, 'add_lookup_indexes', _add_lookup_indexes),
+    (3, 'add_fulltext_index', _add_fulltext_index),
+    (4, 'add_content_hash', _add_content_hash),
+]
+
+
+def applied_versions(engine) -> List[int]:
+    """Versions already recorded in schema_migrations"""
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        return sorted(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine) -> List[int]:
+    """Apply every pending migration in order and return the versions applied"""
+    applied = set(applied_versions(engine))
+    newly_applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            with engine.begin() as connection:
+                migrate(connection)
+                connection.execute(schema_migrations.insert(), {
+                    'version': version,
+                    'name': name,
+                    'applied_at': datetime.utcnow()
+                })
+        except IntegrityError:
+            # Another process recorded this version first; the migration is idempotent
+            logging.info(f"Migration {version} ({name}) already applied by another process")
+            continue
+        logging.info(f"Applied migration {version}: {name}")
+        newly_applied.append(version)
+    return newly_applied
+
+
+def drop_schema(engine):
+    """Drop every table, including the migration history"""
+    Base.metadata.drop_all(engine)
+    schema_migrations.drop(engine, checkfirst=True)
+
+
+def main():
+    """Apply pending migrations, or print their status with --status"""
+    import argparse
+    from database import create_database_engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help='list migrations without applying them')
+    args = parser.parse_args()
+
+    engine = create_database_engine()
+    if engine is None:
+        print("❌ Failed to create database engine")
+        return
+
+    if args.status:
+        applied = set(applied_versions(engine))
+        for version, name, _ in MIGRATIONS:
+            print(f"  {'✅' if version in applied else '⏳'} {version:04d} {name}")
+        return
+
+    newly_applied = run_migrations(engine)
+    if newly_applied:
+        print(f"✅ Applied migrations: {', '.join(str(version) for version in newly_applied)}")
+    else:
+        print("ℹ️  Schema is up to date")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
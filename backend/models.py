@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -10,7 +10,9 @@ grant_tags = Table(
     'grant_tags',
     Base.metadata,
     Column('grant_id', Integer, ForeignKey('grants.id'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True),
+    # The primary key covers grant -> tags; this covers tag -> grants
+    Index('ix_grant_tags_tag_id', 'tag_id')
 )
 
 class Grant(Base):
@@ -21,20 +23,39 @@ class Grant(Base):
     grant_description = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # SHA-256 of the normalized name and description (text_utils.content_hash), used for dedupe
+    content_hash = Column(String(64), nullable=True)
     
     # Many-to-many relationship with tags
     tags = relationship("Tag", secondary=grant_tags, back_populates="grants")
     
-    def to_dict(self):
-        """Convert grant to dictionary"""
-        return {
-            'id': self.id,
-            'grant_name': self.grant_name,
-            'grant_description': self.grant_description,
-            'tags': [tag.name for tag in self.tags],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    __table_args__ = (
+        Index('ix_grants_grant_name', 'grant_name'),
+        Index('ix_grants_created_at', 'created_at'),
+        Index('ux_grants_content_hash', 'content_hash', unique=True),
+        # Full-text search on MySQL; other backends fall back to an in-process BM25 index
+        Index('ix_grants_fulltext', 'grant_name', 'grant_description', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+    
+    # Fields available to to_dict(), in output order
+    DICT_FIELDS = ('id', 'grant_name', 'grant_description', 'tags', 'created_at', 'updated_at')
+    
+    def to_dict(self, fields=None):
+        """Convert grant to dictionary, optionally keeping only the given fields"""
+        fields = self.DICT_FIELDS if fields is None else fields
+        data = {}
+        for field in self.DICT_FIELDS:
+            if field not in fields:
+                continue
+            # Only touch requested attributes so deferred columns and tags stay unloaded
+            if field == 'tags':
+                data[field] = [tag.name for tag in self.tags]
+            elif field in ('created_at', 'updated_at'):
+                value = getattr(self, field)
+                data[field] = value.isoformat() if value else None
+            else:
+                data[field] = getattr(self, field)
+        return data
 
 class Tag(Base):
     __tablename__ = 'tags'
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Opt-in profiling of tagging and database calls.
+
+Methods wrapped with @profiled (or every public method of a class wrapped
+with @profile_methods) run unprofiled unless a mode is active, either for
+the whole process (PROFILE_MODE) or for one API request (X-Profile header,
+honoured only when PROFILE_ALLOW_HEADER=TRUE). Modes:
+
+    cprofile  deterministic profile written as a .pstats file
+    stacks    sampled call stacks written as a folded .folded file, the input
+              format of flamegraph.pl, speedscope and similar tools
+
+Only the outermost profiled call in a thread writes a file, so nested calls
+(add_grants -> assign_tags_batch -> _string_matching_tags) show up inside
+one profile. Work done on other threads or processes (the LLM thread pool,
+parallel rule tagging) is not captured.
+
+Print the top of a saved cProfile file with:
+
+    python profiling.py data/profiles/<file>.pstats --limit 30
+"""
+
+import argparse
+import cProfile
+import functools
+import inspect
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODES = ('cprofile', 'stacks')
+
+PROFILE_CONFIG = {
+    'mode': (os.getenv('PROFILE_MODE') or 'off').lower(),
+    'dir': os.getenv('PROFILE_DIR') or os.path.join(os.path.dirname(__file__), 'data', 'profiles'),
+    'allow_header': os.getenv('PROFILE_ALLOW_HEADER', 'FALSE').upper() == 'TRUE',
+    'sample_interval': float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5)) / 1000
+}
+
+# Mode requested for the current API request, if any
+_request_mode: ContextVar[Optional[str]] = ContextVar('profile_request_mode', default=None)
+# Files written while serving the current request
+_request_outputs: ContextVar[Optional[List[str]]] = ContextVar('profile_request_outputs', default=None)
+# Set while the outermost profiled call of this thread is running
+_profiling_active: ContextVar[bool] = ContextVar('profiling_active', default=False)
+
+
+def parse_mode(value: Optional[str]) -> Optional[str]:
+    """Normalize an X-Profile header value; 1/true selects cprofile, unknown values disable"""
+    value = (value or '').strip().lower()
+    if value in ('1', 'true', 'yes'):
+        return 'cprofile'
+    return value if value in MODES else None
+
+
+def start_request(mode: Optional[str]):
+    """Profile the current request in mode; returns a token for end_request()"""
+    return _request_mode.set(mode), _request_outputs.set([])
+
+
+def end_request(token):
+    mode_token, outputs_token = token
+    _request_mode.reset(mode_token)
+    _request_outputs.reset(outputs_token)
+
+
+def request_outputs() -> List[str]:
+    """Profile files written during the current request"""
+    return _request_outputs.get() or []
+
+
+def active_mode() -> Optional[str]:
+    mode = _request_mode.get() or PROFILE_CONFIG['mode']
+    return mode if mode in MODES else None
+
+
+class StackSampler:
+    """Samples one thread's call stack at a fixed interval and counts folded stacks"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _output_path(name: str, extension: str) -> str:
+    os.makedirs(PROFILE_CONFIG['dir'], exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return os.path.join(PROFILE_CONFIG['dir'], f"{stamp}-{os.getpid()}-{time.time_ns() % 1000000:06d}-{name}.{extension}")
+
+
+def _run_profiled(mode: str, name: str, func, args, kwargs):
+    """Call func under the profiler for mode and write the result to PROFILE_DIR"""
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python 3.12+ allows one active profiler; concurrent calls run unprofiled
+            print(f"Warning: Skipping profile of {name}: {e}")
+            return func(*args, **kwargs)
+    else:
+        profiler = StackSampler(threading.get_ident(), PROFILE_CONFIG['sample_interval'])
+        profiler.start()
+    token = _profiling_active.set(True)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _profiling_active.reset(token)
+        try:
+            if mode == 'cprofile':
+                profiler.disable()
+                path = _output_path(name, 'pstats')
+                profiler.dump_stats(path)
+            else:
+                profiler.stop()
+                path = _output_path(name, 'folded')
+                profiler.write(path)
+            outputs = _request_outputs.get()
+            if outputs is not None:
+                outputs.append(os.path.basename(path))
+        except OSError as e:
+            print(f"Warning: Could not write profile for {name}: {e}")
+
+
+def profiled(func):
+    """Profile calls to func when a profiling mode is active; otherwise call it directly"""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        mode = active_mode()
+        if mode is None or _profiling_active.get():
+            return func(*args, **kwargs)
+        return _run_profiled(mode, name, func, args, kwargs)
+
+    return wrapper
+
+
+def profile_methods(cls):
+    """Class decorator applying @profiled to every public method defined on cls"""
+    for attribute, value in list(vars(cls).items()):
+        if not attribute.startswith('_') and inspect.isfunction(value):
+            setattr(cls, attribute, profiled(value))
+    return cls
+
+
+def main():
+    """Print the most expensive functions of a saved .pstats profile"""
+    parser = argparse.ArgumentParser(description='Summarize a saved cProfile file')
+    parser.add_argument('path', help='.pstats file written in cprofile mode')
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key (cumulative, tottime, calls, ...)')
+    parser.add_argument('--limit', type=int, default=25, help='number of functions to show')
+    args = parser.parse_args()
+
+    pstats.Stats(args.path).strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+
+class ResultCache:
+    """
+    LRU cache of read results with a TTL and write-driven invalidation.
+
+    Every key is combined with a generation counter; bump_generation() after
+    a write makes all earlier entries unreachable at once, and they age out
+    of the LRU. The TTL bounds staleness for writes made by other processes
+    (for example the ingest worker), which this process cannot see.
+
+    Cached results are shared between callers, so they are stored frozen
+    (read-only dicts and tuples); copy one before modifying it.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> 'ResultCache':
+        """Build a cache from RESULT_CACHE_SIZE and RESULT_CACHE_TTL (0 disables caching)"""
+        return cls(
+            max_entries=int(os.getenv('RESULT_CACHE_SIZE', 256)),
+            ttl_seconds=float(os.getenv('RESULT_CACHE_TTL', 60))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def bump_generation(self):
+        """Invalidate every cached result after a write"""
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Dict]) -> Dict:
+        """
+        Return the cached result for key, or compute and cache it.
+
+        Only successful results are cached.
+        """
+        if not self.enabled:
+            return compute()
+
+        with self.lock:
+            generation = self.generation
+            entry = self.entries.get((generation, key))
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end((generation, key))
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = compute()
+        if result.get('success'):
+            result = freeze(result)
+            with self.lock:
+                # A write during compute() bumped the generation; the result may predate it
+                if generation == self.generation:
+                    self.entries[(generation, key)] = (time.monotonic() + self.ttl_seconds, result)
+                    self.entries.move_to_end((generation, key))
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'generation': self.generation
+            }
+
+
+class FrozenDict(dict):
+    """Read-only dict for shared cached results; dict(frozen) gives a mutable copy"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Cached results are read-only; copy them before modifying")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+
+def freeze(value):
+    """Recursively turn dicts into FrozenDicts and lists into tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
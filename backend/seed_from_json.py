@@ -7,6 +7,8 @@ import json
 import os
 from database import DB_CONFIG, create_database_engine
 from models import Grant, Tag
+from bulk_ingest import bulk_insert_grants, find_existing_grant_names, load_tag_id_map, split_duplicates
+from tagging_service import GrantTaggingService
 from sqlalchemy.orm import sessionmaker
 
 def load_grants_from_json():
@@ -35,10 +37,13 @@ def create_tags_from_grants(session, grants_data):
         if 'tags' in grant:
             all_tags.update(grant['tags'])
     
+    # Look up every existing tag in one query
+    existing_tags = {tag.name: tag for tag in session.query(Tag).all()}
+    
     created_tags = []
     for tag_name in sorted(all_tags):
         # Check if tag already exists
-        existing_tag = session.query(Tag).filter_by(name=tag_name).first()
+        existing_tag = existing_tags.get(tag_name)
         if not existing_tag:
             tag = Tag(name=tag_name)
             session.add(tag)
@@ -56,39 +61,44 @@ def create_grants_from_json(session, grants_data):
     """Create grants from JSON data"""
     print("📝 Creating grants from JSON data...")
     
-    created_grants = []
+    # Check which grants already exist with a few chunked queries
+    existing_names = find_existing_grant_names(session, [grant_data['grant_name'] for grant_data in grants_data])
+    
+    new_grants = []
+    seen_names = set(existing_names)
     for grant_data in grants_data:
-        # Check if grant already exists
-        existing_grant = session.query(Grant).filter_by(grant_name=grant_data['grant_name']).first()
-        if not existing_grant:
-            # Create grant
-            grant = Grant(
-                grant_name=grant_data['grant_name'],
-                grant_description=grant_data['grant_description']
-            )
-            session.add(grant)
-            session.flush()  # Get the ID
-            
-            # Assign tags
-            assigned_tags = []
-            if 'tags' in grant_data:
-                for tag_name in grant_data['tags']:
-                    tag = session.query(Tag).filter_by(name=tag_name).first()
-                    if tag:
-                        grant.tags.append(tag)
-                        assigned_tags.append(tag_name)
-            
-            print(f"  ✅ Created grant: {grant_data['grant_name']}")
-            if assigned_tags:
-                print(f"     📋 Tags: {', '.join(assigned_tags[:5])}{'...' if len(assigned_tags) > 5 else ''}")
-            
-            created_grants.append(grant)
-        else:
+        if grant_data['grant_name'] in seen_names:
             print(f"  ℹ️  Grant already exists: {grant_data['grant_name']}")
-            created_grants.append(existing_grant)
+        else:
+            seen_names.add(grant_data['grant_name'])
+            new_grants.append(grant_data)
+    
+    # Grants with new names can still repeat stored content; the content hash catches those
+    new_positions, hashes, _ = split_duplicates(session, new_grants)
+    for position in sorted(set(range(len(new_grants))) - set(new_positions)):
+        print(f"  ℹ️  Grant content already exists: {new_grants[position]['grant_name']}")
+    content_hashes = [hashes[position] for position in new_positions]
+    new_grants = [new_grants[position] for position in new_positions]
+    
+    # Grants without tags in the JSON are auto-tagged in a single batch call
+    tag_lists = [grant_data.get('tags') for grant_data in new_grants]
+    untagged = [i for i, tag_names in enumerate(tag_lists) if tag_names is None]
+    if untagged:
+        print(f"🏷️  Auto-tagging {len(untagged)} grants without tags...")
+        auto_tags = GrantTaggingService().assign_tags_batch([new_grants[i] for i in untagged])
+        for i, tag_names in zip(untagged, auto_tags):
+            tag_lists[i] = tag_names
+    
+    # Insert grants and their tags with bulk statements
+    created_grants = bulk_insert_grants(session, new_grants, tag_lists, load_tag_id_map(session), content_hashes)
+    for grant in created_grants:
+        assigned_tags = grant['tags']
+        print(f"  ✅ Created grant: {grant['grant_name']}")
+        if assigned_tags:
+            print(f"     📋 Tags: {', '.join(assigned_tags[:5])}{'...' if len(assigned_tags) > 5 else ''}")
     
     session.commit()
-    print(f"📊 Total grants: {len(created_grants)}")
+    print(f"📊 Total grants: {len(created_grants)} created, {len(grants_data) - len(new_grants)} already present")
     return created_grants
 
 def main():
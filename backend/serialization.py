@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Optional fast paths: orjson for encoding, brotli for compression
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response compression (off by default; usually a reverse proxy or the platform handles it)
+COMPRESSION_CONFIG = {
+    'enabled': os.getenv('RESPONSE_COMPRESSION', 'FALSE').upper() == 'TRUE',
+    'min_bytes': int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', 1024)),
+    'gzip_level': int(os.getenv('RESPONSE_GZIP_LEVEL', 5)),
+    'brotli_quality': int(os.getenv('RESPONSE_BROTLI_QUALITY', 4))
+}
+
+
+def dumps(payload) -> bytes:
+    """Encode a JSON payload to UTF-8 bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Encodings listed in an Accept-Encoding header, minus any refused with q=0"""
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a response body for the client's Accept-Encoding.
+
+    Returns the (possibly unchanged) body and the Content-Encoding to send,
+    or None when compression is disabled, the body is small or the client
+    accepts neither brotli nor gzip.
+    """
+    if not COMPRESSION_CONFIG['enabled'] or len(body) < COMPRESSION_CONFIG['min_bytes']:
+        return body, None
+
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return brotli.compress(body, quality=COMPRESSION_CONFIG['brotli_quality']), 'br'
+    if 'gzip' in accepted:
+        return gzip.compress(body, compresslevel=COMPRESSION_CONFIG['gzip_level']), 'gzip'
+    return body, None
+
+
+def grant_rows_to_dicts(rows: Iterable[Sequence], fields: Sequence[str],
+                        tag_names_by_grant: Optional[Dict[int, List[str]]] = None) -> List[Dict]:
+    """
+    Build Grant.to_dict()-shaped dicts from plain row tuples.
+
+    fields lists the columns of each row (including 'id'); 'tags' is not a
+    column and is filled in from tag_names_by_grant when present in fields.
+    """
+    columns = [field for field in fields if field != 'tags']
+    datetime_positions = [position for position, field in enumerate(columns) if field in ('created_at', 'updated_at')]
+    id_position = columns.index('id')
+    # Output keys follow fields; None marks the tags slot
+    layout = [(field, columns.index(field) if field != 'tags' else None) for field in fields]
+
+    grants = []
+    for row in rows:
+        if datetime_positions:
+            row = list(row)
+            for position in datetime_positions:
+                value = row[position]
+                row[position] = value.isoformat() if value else None
+        grants.append({
+            field: row[position] if position is not None else tag_names_by_grant.get(row[id_position], [])
+            for field, position in layout
+        })
+    return grants
@@ -7,11 +7,17 @@ Run this script to create the database and tables
 import os
 import sys
 from sqlalchemy import create_engine, text
-from database import get_database_url, DB_CONFIG, create_database_engine, create_server_engine
-from models import Base
+from database import get_backend_name, get_database_url, DB_CONFIG, create_database_engine, create_server_engine
+from database_service import DatabaseService
+from migrations import drop_schema
 
 def create_database():
     """Create the database if it doesn't exist"""
+    # SQLite and in-memory databases are created on first connection
+    if get_backend_name(get_database_url()) != 'mysql':
+        print(f"ℹ️  Using {get_backend_name(get_database_url())} database, no server database to create")
+        return True
+    
     try:
         # Use the existing server engine creation function (handles proxy automatically)
         engine = create_server_engine()
@@ -44,9 +50,9 @@ def reset_database():
         
         print(f"  🔗 Connected to database: {DB_CONFIG['database']}")
         
-        # Drop all tables
+        # Drop all tables, including the migration history
         print("  🗑️  Dropping all tables...")
-        Base.metadata.drop_all(engine)
+        drop_schema(engine)
         print("  ✅ All tables dropped")
         
         # Force commit the drop operation
@@ -59,9 +65,9 @@ def reset_database():
             print("❌ Failed to reconnect to database")
             return False
         
-        # Recreate all tables
+        # Recreate all tables and the default tags
         print("  🔨 Recreating all tables...")
-        Base.metadata.create_all(engine)
+        DatabaseService(setup=False).setup()
         print("  ✅ All tables recreated")
         
         # Verify tables are empty
@@ -89,7 +95,7 @@ def reset_database():
         return False
 
 def create_tables():
-    """Create all tables"""
+    """Create all tables and apply pending schema migrations"""
     try:
         # Use the existing database engine creation function (handles proxy automatically)
         engine = create_database_engine()
@@ -97,8 +103,10 @@ def create_tables():
             print("❌ Failed to create database engine")
             return False
         
-        # Create all tables
-        Base.metadata.create_all(engine)
+        # Create all tables, bring existing ones up to date and insert the default tags
+        applied = DatabaseService(setup=False).setup()
+        if applied:
+            print(f"✅ Applied migrations: {', '.join(str(version) for version in applied)}")
         print("✅ All tables created successfully")
         return True
         
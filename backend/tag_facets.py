@@ -0,0 +1,74 @@
+import threading
+from collections import Counter
+from itertools import groupby
+from typing import Dict, Iterable
+
+from models import Tag, grant_tags
+
+
+class TagFacetCounts:
+    """
+    Precomputed tag counts and pairwise tag co-occurrence.
+
+    counts[tag] is the number of grants carrying tag and
+    cooccurrence[a][b] the number carrying both a and b, so the facet counts
+    for no selection or a single selected tag are plain dictionary lookups.
+    Kept up to date incrementally as grants are added and deleted.
+    """
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.cooccurrence: Dict[str, Counter] = {}
+        self.total_grants = 0
+        self.lock = threading.RLock()
+
+    @classmethod
+    def build(cls, session, total_grants: int) -> 'TagFacetCounts':
+        """Build the structure from every grant_tags row in one streaming query"""
+        facets = cls()
+        rows = session.query(grant_tags.c.grant_id, Tag.name).join(
+            Tag, Tag.id == grant_tags.c.tag_id
+        ).order_by(grant_tags.c.grant_id).yield_per(10000)
+        for _, grant_rows in groupby(rows, key=lambda row: row[0]):
+            facets._update([tag_name for _, tag_name in grant_rows], 1)
+        facets.total_grants = total_grants
+        return facets
+
+    def _update(self, tag_names: Iterable[str], delta: int):
+        tag_names = set(tag_names)
+        for tag_name in tag_names:
+            self.counts[tag_name] += delta
+            row = self.cooccurrence.setdefault(tag_name, Counter())
+            for other in tag_names:
+                if other != tag_name:
+                    row[other] += delta
+
+    def add_grant(self, tag_names: Iterable[str]):
+        """Count a newly inserted grant"""
+        with self.lock:
+            self._update(tag_names, 1)
+            self.total_grants += 1
+
+    def remove_grant(self, tag_names: Iterable[str]):
+        """Uncount a deleted grant"""
+        with self.lock:
+            self._update(tag_names, -1)
+            self.total_grants -= 1
+
+    def facet_counts(self, tag_names: Iterable[str], selected_tag: str = None) -> Dict[str, int]:
+        """Counts for every tag in tag_names, optionally restricted to grants with selected_tag"""
+        with self.lock:
+            if selected_tag is None:
+                return {tag_name: self.counts.get(tag_name, 0) for tag_name in tag_names}
+
+            row = self.cooccurrence.get(selected_tag, Counter())
+            selected_count = self.counts.get(selected_tag, 0)
+            return {
+                tag_name: selected_count if tag_name == selected_tag else row.get(tag_name, 0)
+                for tag_name in tag_names
+            }
+
+    def matching_count(self, selected_tag: str = None) -> int:
+        """Number of grants in the current selection"""
+        with self.lock:
+            return self.total_grants if selected_tag is None else self.counts.get(selected_tag, 0)
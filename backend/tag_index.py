@@ -0,0 +1,137 @@
+import threading
+import time
+from functools import reduce
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import Grant, Tag, grant_tags
+from tag_query import AndExpr, NotExpr, OrExpr, TagTerm, TagQueryError
+
+
+class TagBitmapIndex:
+    """
+    In-process inverted index from tag name to a bitmap of grant ids.
+
+    Bitmaps are plain Python integers (bit n set = grant n has the tag), so
+    intersections, unions and complements run as single C-level big-integer
+    operations: at one million grants a bitmap is 125 KB and an AND of two
+    takes microseconds. The index reflects writes made through this process;
+    other processes' writes are picked up on rebuild.
+    """
+
+    def __init__(self):
+        self.bitmaps: Dict[str, int] = {}
+        self.universe = 0
+        self.built_at = 0.0
+        self.lock = threading.RLock()
+
+    @classmethod
+    def build(cls, session) -> 'TagBitmapIndex':
+        """Build the index from the database with two streaming queries"""
+        index = cls()
+        index.rebuild(session)
+        return index
+
+    def rebuild(self, session):
+        """Replace the index contents with a fresh snapshot of the database"""
+        # Bits are set in byte buffers and each bitmap is converted to an int once;
+        # OR-ing into a growing int per row would copy it every time (quadratic)
+        universe = bytearray()
+        for (grant_id,) in session.query(Grant.id).yield_per(10000):
+            self._set_bit(universe, grant_id)
+
+        buffers: Dict[str, bytearray] = {}
+        rows = session.query(Tag.name, grant_tags.c.grant_id).join(
+            grant_tags, grant_tags.c.tag_id == Tag.id
+        ).yield_per(10000)
+        for tag_name, grant_id in rows:
+            buffer = buffers.get(tag_name)
+            if buffer is None:
+                buffer = buffers[tag_name] = bytearray(len(universe))
+            self._set_bit(buffer, grant_id)
+
+        bitmaps = {tag_name: int.from_bytes(buffer, 'little') for tag_name, buffer in buffers.items()}
+        with self.lock:
+            self.bitmaps = bitmaps
+            self.universe = int.from_bytes(universe, 'little')
+            self.built_at = time.monotonic()
+
+    @staticmethod
+    def _set_bit(buffer: bytearray, position: int):
+        byte = position >> 3
+        if byte >= len(buffer):
+            buffer.extend(bytes(max(byte + 1 - len(buffer), len(buffer))))
+        buffer[byte] |= 1 << (position & 7)
+
+    @classmethod
+    def ids_to_bitmap(cls, ids: Iterable[int]) -> int:
+        """Bitmap with the given positions set"""
+        buffer = bytearray()
+        for position in ids:
+            cls._set_bit(buffer, position)
+        return int.from_bytes(buffer, 'little')
+
+    def add_grants(self, grants: Iterable[Tuple[int, Iterable[str]]]):
+        """Record newly inserted (grant_id, tag_names) pairs with one OR per tag"""
+        grant_ids = []
+        ids_by_tag: Dict[str, List[int]] = {}
+        for grant_id, tag_names in grants:
+            grant_ids.append(grant_id)
+            for tag_name in tag_names:
+                ids_by_tag.setdefault(tag_name, []).append(grant_id)
+        masks = {tag_name: self.ids_to_bitmap(ids) for tag_name, ids in ids_by_tag.items()}
+        universe_mask = self.ids_to_bitmap(grant_ids)
+
+        with self.lock:
+            self.universe |= universe_mask
+            for tag_name, mask in masks.items():
+                self.bitmaps[tag_name] = self.bitmaps.get(tag_name, 0) | mask
+
+    def add_grant(self, grant_id: int, tag_names: Iterable[str]):
+        """Record a newly inserted grant"""
+        self.add_grants([(grant_id, tag_names)])
+
+    def remove_grant(self, grant_id: int, tag_names: Optional[Iterable[str]] = None):
+        """Forget a deleted grant; pass its tag names to only touch those bitmaps"""
+        mask = ~(1 << grant_id)
+        with self.lock:
+            self.universe &= mask
+            for tag_name in (list(self.bitmaps) if tag_names is None else tag_names):
+                if tag_name in self.bitmaps:
+                    self.bitmaps[tag_name] &= mask
+
+    def evaluate(self, node) -> int:
+        """Evaluate a tag query tree to a bitmap of matching grant ids"""
+        with self.lock:
+            return self._evaluate(node)
+
+    def _evaluate(self, node) -> int:
+        if isinstance(node, TagTerm):
+            return self.bitmaps.get(node.name, 0)
+        if isinstance(node, NotExpr):
+            return self.universe & ~self._evaluate(node.child)
+        if isinstance(node, AndExpr):
+            return reduce(lambda left, right: left & right, (self._evaluate(child) for child in node.children))
+        if isinstance(node, OrExpr):
+            return reduce(lambda left, right: left | right, (self._evaluate(child) for child in node.children))
+        raise TagQueryError(f"Unsupported expression node: {node!r}")
+
+    def search(self, node) -> List[int]:
+        """Grant ids matching a tag query tree, in ascending order"""
+        return self.bitmap_to_ids(self.evaluate(node))
+
+    @staticmethod
+    def bitmap_to_ids(bitmap: int) -> List[int]:
+        """Positions of the set bits in ascending order"""
+        # Scanning the binary string keeps the per-bit work in C
+        bits = bin(bitmap)[:1:-1]
+        ids = []
+        position = bits.find('1')
+        while position != -1:
+            ids.append(position)
+            position = bits.find('1', position + 1)
+        return ids
+
+    @staticmethod
+    def count(bitmap: int) -> int:
+        """Number of set bits"""
+        return bin(bitmap).count('1')
@@ -0,0 +1,132 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from text_utils import TOKEN_PATTERN, tokenize
+
+
+class SubstringMatcher:
+    """
+    Single-pass multi-pattern substring matcher.
+
+    All patterns are folded into a character trie which is compiled into one
+    regular expression wrapped in a lookahead, so ``finditer`` visits every
+    position of the text exactly once and reports the longest pattern that
+    starts there. Any other pattern starting at the same position is a prefix
+    of that one, so each pattern's output already includes the tags of its
+    prefixes. The result is identical to testing ``pattern in text`` for every
+    pattern, but the cost depends on the text length rather than on the
+    number of patterns.
+    """
+
+    def __init__(self, patterns: Dict[str, Iterable[str]]):
+        self.patterns = {pattern: frozenset(tags) for pattern, tags in patterns.items() if pattern}
+
+        trie: Dict = {}
+        for pattern in self.patterns:
+            node = trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[''] = True
+
+        self._regex = re.compile(f"(?=({self._trie_to_regex(trie)}))") if trie else None
+
+        # Tags reported for a match = tags of the pattern and of every pattern that is a prefix of it
+        self._outputs: Dict[str, FrozenSet[str]] = {}
+        for pattern in self.patterns:
+            tags = set()
+            for end in range(1, len(pattern) + 1):
+                tags.update(self.patterns.get(pattern[:end], ()))
+            self._outputs[pattern] = frozenset(tags)
+
+    def _trie_to_regex(self, node: Dict) -> str:
+        """Render a trie node as a regex that prefers the longest continuation"""
+        branches = [re.escape(char) + self._trie_to_regex(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if '' in node:
+            # A pattern ends here; the greedy optional still tries to extend it first
+            return f"(?:{body})?"
+        return body
+
+    def match(self, text: str) -> Set[str]:
+        """Return the tags of every pattern occurring in text"""
+        matched: Set[str] = set()
+        if self._regex is None:
+            return matched
+
+        outputs = self._outputs
+        for found in self._regex.finditer(text):
+            matched |= outputs[found.group(1)]
+        return matched
+
+
+class TokenMatcher:
+    """
+    Word-boundary-aware matcher backed by an inverted n-gram index.
+
+    Patterns and text are normalized the same way (lowercased, split on any
+    non-alphanumeric character) so "farm-to-school" and "farm to school" share
+    the key ("farm", "to", "school"). Matching looks up every n-gram of the
+    text up to the longest pattern length, so "wi" no longer fires inside
+    "wisconsin" and the cost is linear in the number of tokens.
+
+    A match only counts when no longer match covers its tokens and it does
+    not cut through a hyphenated compound, so "co-op" does not yield the
+    "co" (Colorado) tag and "farm-to-school" does not also count as "farm".
+    """
+
+    def __init__(self, patterns: Dict[str, Iterable[str]]):
+        self.index: Dict[Tuple[str, ...], Set[str]] = {}
+        for pattern, tags in patterns.items():
+            key = tuple(tokenize(pattern))
+            if key:
+                self.index.setdefault(key, set()).update(tags)
+
+        self.max_ngram = max((len(key) for key in self.index), default=0)
+
+    @staticmethod
+    def _tokens_with_compounds(text: str) -> Tuple[List[str], List[int], List[int]]:
+        """
+        Tokens of text plus, for each token, the first and one-past-last token
+        index of the hyphenated compound it belongs to (itself for plain words).
+        """
+        tokens, compound_start, compound_end = [], [], []
+        previous_end = None
+        for found in TOKEN_PATTERN.finditer((text or "").lower()):
+            joined = previous_end is not None and found.start() == previous_end + 1 and text[previous_end] == '-'
+            compound_start.append(compound_start[-1] if joined else len(tokens))
+            tokens.append(found.group())
+            previous_end = found.end()
+        for position in range(len(tokens) - 1, -1, -1):
+            is_last = position + 1 == len(tokens) or compound_start[position + 1] != compound_start[position]
+            compound_end.append(position + 1 if is_last else compound_end[-1])
+        compound_end.reverse()
+        return tokens, compound_start, compound_end
+
+    def match(self, text: str) -> Set[str]:
+        """Return the tags of every pattern occurring as a whole-word sequence in text"""
+        tokens, compound_start, compound_end = self._tokens_with_compounds(text)
+        index = self.index
+
+        # (start, end, tags) of every n-gram in the index that does not split a compound
+        candidates = []
+        for start in range(len(tokens)):
+            if compound_start[start] != start:
+                continue
+            for end in range(start + 1, min(start + self.max_ngram, len(tokens)) + 1):
+                if compound_end[end - 1] != end:
+                    continue
+                tags = index.get(tuple(tokens[start:end]))
+                if tags:
+                    candidates.append((start, end, tags))
+
+        matched: Set[str] = set()
+        for start, end, tags in candidates:
+            covered = any(other_start <= start and end <= other_end and other_end - other_start > end - start
+                          for other_start, other_end, _ in candidates)
+            if not covered:
+                matched |= tags
+        return matched
@@ -0,0 +1,204 @@
+import re
+from collections import namedtuple
+from typing import List
+
+from sqlalchemy import and_, exists, func, not_, or_, select
+from models import Grant, Tag, grant_tags
+
+
+class TagQueryError(ValueError):
+    """Raised when a tag query expression cannot be parsed"""
+
+
+# Expression tree nodes
+TagTerm = namedtuple('TagTerm', ['name'])
+AndExpr = namedtuple('AndExpr', ['children'])
+OrExpr = namedtuple('OrExpr', ['children'])
+NotExpr = namedtuple('NotExpr', ['child'])
+
+TOKEN_PATTERN = re.compile(r"\s*(?:(\()|(\))|([A-Za-z0-9][A-Za-z0-9_-]*))")
+KEYWORDS = ('AND', 'OR', 'NOT')
+
+
+def _tokenize(expression: str) -> List[str]:
+    """Split an expression into parentheses, keywords and tag names"""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match:
+            position += len(expression[position:]) - len(expression[position:].lstrip())
+            raise TagQueryError(f"Unexpected character at position {position}: {expression[position]!r}")
+        tokens.append(match.group(match.lastindex))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive-descent parser for tag expressions.
+
+    Grammar (NOT binds tightest, then AND, then OR):
+        or_expr  := and_expr ("OR" and_expr)*
+        and_expr := not_expr ("AND" not_expr)*
+        not_expr := "NOT" not_expr | "(" or_expr ")" | TAG
+    """
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def keyword(self, word: str) -> bool:
+        token = self.peek()
+        if token is not None and token.upper() == word:
+            self.position += 1
+            return True
+        return False
+
+    def parse(self):
+        node = self.or_expr()
+        if self.peek() is not None:
+            raise TagQueryError(f"Unexpected token: {self.peek()!r}")
+        return node
+
+    @staticmethod
+    def combine(node_type, children):
+        # Flatten nested nodes of the same type: (a AND b) AND c -> AND(a, b, c)
+        flat = []
+        for child in children:
+            flat.extend(child.children if isinstance(child, node_type) else [child])
+        return flat[0] if len(flat) == 1 else node_type(tuple(flat))
+
+    def or_expr(self):
+        children = [self.and_expr()]
+        while self.keyword('OR'):
+            children.append(self.and_expr())
+        return self.combine(OrExpr, children)
+
+    def and_expr(self):
+        children = [self.not_expr()]
+        while self.keyword('AND'):
+            children.append(self.not_expr())
+        return self.combine(AndExpr, children)
+
+    def not_expr(self):
+        if self.keyword('NOT'):
+            return NotExpr(self.not_expr())
+
+        token = self.peek()
+        if token is None:
+            raise TagQueryError("Unexpected end of expression")
+        self.position += 1
+
+        if token == '(':
+            node = self.or_expr()
+            if self.peek() != ')':
+                raise TagQueryError("Missing closing parenthesis")
+            self.position += 1
+            return node
+        if token == ')' or token.upper() in KEYWORDS:
+            raise TagQueryError(f"Unexpected token: {token!r}")
+        return TagTerm(token.lower())
+
+
+def parse_tag_query(expression: str):
+    """Parse an expression such as "(water AND drought) AND NOT flood" into a tree"""
+    if not expression or not expression.strip():
+        raise TagQueryError("Empty tag query")
+    return _Parser(_tokenize(expression)).parse()
+
+
+def all_of(tag_names: List[str]):
+    """Expression matching grants that carry every one of tag_names"""
+    return AndExpr(tuple(TagTerm(name) for name in tag_names))
+
+
+def any_of(tag_names: List[str]):
+    """Expression matching grants that carry at least one of tag_names"""
+    return OrExpr(tuple(TagTerm(name) for name in tag_names))
+
+
+def canonical_tag_query(node) -> str:
+    """
+    Text form of an expression tree that ignores operand order, repeats and
+    nesting of the same operator, so equivalent queries share a cache key:
+    "water AND (drought AND water)" and "drought AND water" both give
+    "AND(drought,water)".
+    """
+    if node is None:
+        return ''
+    if isinstance(node, TagTerm):
+        return node.name
+    if isinstance(node, NotExpr):
+        return f"NOT({canonical_tag_query(node.child)})"
+
+    node_type = type(node)
+    pending, parts = list(node.children), set()
+    while pending:
+        child = pending.pop()
+        if isinstance(child, node_type):
+            pending.extend(child.children)
+        else:
+            parts.add(canonical_tag_query(child))
+    parts = sorted(parts)
+    if len(parts) == 1:
+        return parts[0]
+    return f"{'AND' if node_type is AndExpr else 'OR'}({','.join(parts)})"
+
+
+def _grant_ids_with_tags(tag_names: List[str]):
+    """Subquery of grant ids tagged with any of tag_names"""
+    return select(grant_tags.c.grant_id).join(Tag, Tag.id == grant_tags.c.tag_id).where(Tag.name.in_(tag_names))
+
+
+def _lacks_tag(tag_name: str):
+    """Anti-join: the grant has no row in grant_tags for tag_name"""
+    return ~exists().where(
+        grant_tags.c.grant_id == Grant.id,
+        grant_tags.c.tag_id == Tag.id,
+        Tag.name == tag_name
+    )
+
+
+def compile_tag_query(node):
+    """
+    Compile an expression tree into a filter clause on Grant.
+
+    Plain tags under an AND become one GROUP BY ... HAVING COUNT query, plain
+    tags under an OR become one IN list, and NOT of a tag becomes a NOT
+    EXISTS anti-join, so common queries stay a handful of indexed lookups.
+    """
+    if isinstance(node, TagTerm):
+        return Grant.id.in_(_grant_ids_with_tags([node.name]))
+
+    if isinstance(node, NotExpr):
+        if isinstance(node.child, TagTerm):
+            return _lacks_tag(node.child.name)
+        return not_(compile_tag_query(node.child))
+
+    tag_names = sorted({child.name for child in node.children if isinstance(child, TagTerm)})
+    others = [child for child in node.children if not isinstance(child, TagTerm)]
+
+    if isinstance(node, AndExpr):
+        clauses = []
+        if tag_names:
+            clauses.append(Grant.id.in_(
+                _grant_ids_with_tags(tag_names)
+                .group_by(grant_tags.c.grant_id)
+                .having(func.count(func.distinct(grant_tags.c.tag_id)) == len(tag_names))
+            ))
+        clauses.extend(compile_tag_query(child) for child in others)
+        return and_(*clauses)
+
+    if isinstance(node, OrExpr):
+        clauses = []
+        if tag_names:
+            clauses.append(Grant.id.in_(_grant_ids_with_tags(tag_names)))
+        clauses.extend(compile_tag_query(child) for child in others)
+        return or_(*clauses)
+
+    raise TagQueryError(f"Unsupported expression node: {node!r}")
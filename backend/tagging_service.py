@@ -1,14 +1,37 @@
 import re
 import json
-from typing import List, Dict, Set
-import openai
+import hashlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Optional, Set, Tuple
 import os
 from dotenv import load_dotenv
+from llm_cache import TagResultCache, make_cache_key
+from llm_pipeline import LLMTaggingPipeline
+from metrics import record_phase
+from profiling import profiled
+from tag_matcher import SubstringMatcher, TokenMatcher
 
 load_dotenv()
 
+# Matcher installed once per worker process by _init_tagging_worker
+_worker_matcher = None
+
+def _init_tagging_worker(matcher):
+    """Process-pool initializer: keep the compiled matcher for every later task"""
+    global _worker_matcher
+    _worker_matcher = matcher
+
+def _match_texts(texts: List[str]) -> List[List[str]]:
+    """Rule-based tags for a chunk of lowercased texts, run inside a worker process"""
+    return [list(_worker_matcher.match(text)) for text in texts]
+
 class GrantTaggingService:
-    def __init__(self):
+    MATCH_MODES = ("substring", "token")
+    
+    def __init__(self, match_mode: str = None):
         # Predefined tags from the requirements
         self.predefined_tags = [
             "agriculture", "aquaculture", "capacity-building", "capital", "climate",
@@ -28,19 +51,72 @@ class GrantTaggingService:
             "energy", "renewable-energy", "water-quality", "soil-health", "wildlife-habitat",
             "pasture", "grazing", "manure-management", "disaster-relief", "flood"
         ]
+        self.predefined_tag_set = frozenset(self.predefined_tags)
         
-        # Initialize OpenAI client if API key is available
-        self.openai_client = None
-        if os.getenv('OPENAI_API_KEY'):
-            try:
-                self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            except Exception as e:
-                print(f"Warning: Failed to initialize OpenAI client: {e}")
-                print("Continuing without LLM-enhanced tagging...")
-                self.openai_client = None
+        # OpenAI client, created on first use if an API key is available
+        self._openai_client = None
+        self._openai_client_loaded = False
+        
+        # Concurrent, rate-limited pipeline for batch LLM tagging
+        self.llm_pipeline = LLMTaggingPipeline.from_env()
+        
+        # LLM results are cached per grant content, tag vocabulary and model
+        self.llm_model = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        self.vocabulary_version = hashlib.sha256(
+            "\n".join(self.predefined_tags).encode("utf-8")
+        ).hexdigest()[:16]
+        self.llm_cache = TagResultCache.from_env()
+        
+        # Several grants share one prompt, up to LLM_BATCH_SIZE grants and the prompt token budget
+        self.llm_batch_size = int(os.getenv('LLM_BATCH_SIZE', 10))
+        self.llm_prompt_token_budget = int(os.getenv('LLM_PROMPT_TOKEN_BUDGET', 3000))
         
         # Create keyword mappings for better string matching
         self.keyword_mappings = self._create_keyword_mappings()
+        
+        # Compile every tag and keyword pattern into the configured matcher:
+        # "substring" keeps raw substring semantics, "token" only matches whole words
+        self.match_mode = (match_mode or os.getenv('TAG_MATCH_MODE', 'substring')).lower()
+        if self.match_mode not in self.MATCH_MODES:
+            raise ValueError(f"Unknown tag match mode: {self.match_mode}")
+        
+        match_patterns = self._build_match_patterns()
+        if self.match_mode == "token":
+            self.matcher = TokenMatcher(match_patterns)
+        else:
+            self.matcher = SubstringMatcher(match_patterns)
+        
+        # Large batches are matched on a process pool, created on first use
+        self.parallel_threshold = int(os.getenv('PARALLEL_TAGGING_THRESHOLD', 5000))
+        self.tagging_workers = int(os.getenv('TAGGING_WORKERS') or os.cpu_count() or 1)
+        self._process_pool = None
+    
+    @property
+    def openai_client(self):
+        """The OpenAI client, or None without an API key; the SDK is only imported when needed"""
+        if not self._openai_client_loaded:
+            self._openai_client_loaded = True
+            if os.getenv('OPENAI_API_KEY'):
+                try:
+                    import openai
+                    
+                    # OPENAI_BASE_URL points the client at any OpenAI-compatible server;
+                    # retries are handled by the tagging pipeline, not the client
+                    self._openai_client = openai.OpenAI(
+                        api_key=os.getenv('OPENAI_API_KEY'),
+                        base_url=os.getenv('OPENAI_BASE_URL') or None,
+                        max_retries=0
+                    )
+                except Exception as e:
+                    print(f"Warning: Failed to initialize OpenAI client: {e}")
+                    print("Continuing without LLM-enhanced tagging...")
+                    self._openai_client = None
+        return self._openai_client
+    
+    @openai_client.setter
+    def openai_client(self, client):
+        self._openai_client = client
+        self._openai_client_loaded = True
     
     def _create_keyword_mappings(self) -> Dict[str, List[str]]:
         """Create keyword mappings for improved string matching"""
@@ -85,71 +161,265 @@ class GrantTaggingService:
             "rfa-open": ["rfa", "request for applications", "open", "available"]
         }
     
+    def _build_match_patterns(self) -> Dict[str, Set[str]]:
+        """Map every string-matching pattern to the tags it implies"""
+        patterns: Dict[str, Set[str]] = {}
+        
+        # Direct tag matching, both hyphenated and spaced
+        for tag in self.predefined_tags:
+            patterns.setdefault(tag, set()).add(tag)
+            patterns.setdefault(tag.replace("-", " "), set()).add(tag)
+        
+        # Keyword-based matching
+        for tag, keywords in self.keyword_mappings.items():
+            for keyword in keywords:
+                patterns.setdefault(keyword, set()).add(tag)
+        
+        return patterns
+    
+    @profiled
     def assign_tags(self, grant_name: str, grant_description: str) -> List[str]:
         """
         Assign relevant tags to a grant based on its name and description
         """
+        return self.assign_tags_batch([{
+            'grant_name': grant_name,
+            'grant_description': grant_description
+        }])[0]
+    
+    @profiled
+    def assign_tags_batch(self, grants: List[Dict[str, str]]) -> List[List[str]]:
+        """
+        Assign tags to many grants in one call.
+        
+        Returns one tag list per grant, in input order. Grants with identical
+        text are only matched once per batch.
+        """
         # Combine name and description for analysis
-        full_text = f"{grant_name} {grant_description}".lower()
+        texts = [f"{grant['grant_name']} {grant['grant_description']}".lower() for grant in grants]
         
-        # Get tags from string matching
-        string_match_tags = self._string_matching_tags(full_text)
+        # Get tags from string matching, once per distinct text
+        start = time.perf_counter()
+        rule_tags_by_text = self._rule_tags_for_texts(list(dict.fromkeys(texts)))
+        record_phase('rule', time.perf_counter() - start)
         
         # Get tags from LLM analysis if available
-        llm_tags = []
+        llm_tags = [[] for _ in grants]
         if self.openai_client:
-            try:
-                print("Using LLM for tagging...")
-                llm_tags = self._llm_tagging(grant_name, grant_description)
-            except Exception as e:
-                print(f"LLM tagging failed: {e}")
+            print(f"Using LLM for tagging {len(grants)} grant(s)...")
+            start = time.perf_counter()
+            llm_tags = self._llm_tagging_batch(grants)
+            record_phase('llm', time.perf_counter() - start)
         
-        # Combine and deduplicate tags
-        all_tags = list(set(string_match_tags + llm_tags))
+        # Combine, deduplicate and keep only predefined tags
+        results = []
+        for full_text, grant_llm_tags in zip(texts, llm_tags):
+            all_tags = rule_tags_by_text[full_text].union(grant_llm_tags)
+            results.append([tag for tag in all_tags if tag in self.predefined_tag_set])
         
-        # Filter to only include predefined tags
-        valid_tags = [tag for tag in all_tags if tag in self.predefined_tags]
+        return results
+    
+    def _rule_tags_for_texts(self, texts: List[str]) -> Dict[str, Set[str]]:
+        """Rule-based tags for distinct texts, sharded across processes for large batches"""
+        if len(texts) >= self.parallel_threshold and self.tagging_workers > 1:
+            pool = self._get_process_pool()
+            if pool is not None:
+                chunk_size = -(-len(texts) // (self.tagging_workers * 4))
+                chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+                try:
+                    results = {}
+                    for chunk, chunk_tags in zip(chunks, pool.map(_match_texts, chunks)):
+                        results.update((text, set(tags)) for text, tags in zip(chunk, chunk_tags))
+                    return results
+                except (BrokenProcessPool, OSError) as e:
+                    # Workers start on first use, so spawn failures (e.g. no /dev/shm) surface here
+                    print(f"Warning: Parallel tagging unavailable, continuing in-process: {e}")
+                    self.shutdown()
+                    self.tagging_workers = 1
         
-        return valid_tags
+        return {text: set(self._string_matching_tags(text)) for text in texts}
     
+    def _get_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Create the tagging process pool on first use; None if processes are unavailable"""
+        if self._process_pool is None:
+            try:
+                # Workers are spawned, not forked: the API process runs request and LLM threads.
+                # The matcher is sent to each worker once, not with every task
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.tagging_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_tagging_worker,
+                    initargs=(self.matcher,)
+                )
+            except (OSError, NotImplementedError) as e:
+                print(f"Warning: Parallel tagging unavailable, continuing in-process: {e}")
+                self.tagging_workers = 1
+        return self._process_pool
+    
+    def shutdown(self):
+        """Stop the tagging process pool, if one was started"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+    
+    @profiled
     def _string_matching_tags(self, text: str) -> List[str]:
         """Extract tags using string matching"""
-        matched_tags = set()
+        # Compound terms such as "farm to school" are covered by the spaced tag patterns
+        return list(self.matcher.match(text))
+    
+    def _llm_cache_key(self, grant: Dict[str, str]) -> str:
+        """Cache key for a grant's LLM tags"""
+        return make_cache_key(
+            grant['grant_name'], grant['grant_description'], self.vocabulary_version, self.llm_model
+        )
+    
+    @profiled
+    def _llm_tagging(self, grant_name: str, grant_description: str) -> List[str]:
+        """Use OpenAI to assign tags based on semantic understanding"""
+        if not self.openai_client:
+            return []
         
-        # Direct tag matching
-        for tag in self.predefined_tags:
-            if tag.replace("-", " ") in text or tag in text:
-                matched_tags.add(tag)
+        return self._llm_tagging_batch([{
+            'grant_name': grant_name,
+            'grant_description': grant_description
+        }])[0]
+    
+    @profiled
+    def _llm_tagging_batch(self, grants: List[Dict[str, str]]) -> List[List[str]]:
+        """LLM tags for many grants, served from the cache where possible"""
+        keys = [self._llm_cache_key(grant) for grant in grants]
+        results = [self.llm_cache.get(key) for key in keys]
         
-        # Keyword-based matching
-        for tag, keywords in self.keyword_mappings.items():
-            for keyword in keywords:
-                if keyword in text:
-                    matched_tags.add(tag)
+        # Identical grants in the batch share a single request
+        pending: Dict[str, Dict[str, str]] = {}
+        for key, grant, tags in zip(keys, grants, results):
+            if tags is None and key not in pending:
+                pending[key] = grant
         
-        # Special case matching for compound terms
-        if "farm to school" in text or "farm-to-school" in text:
-            matched_tags.add("farm-to-school")
+        if pending:
+            fetched_by_key = self._fetch_llm_tags(pending)
+            for key, tags in fetched_by_key.items():
+                # Failed requests are not cached so they are retried next time
+                if tags is not None:
+                    self.llm_cache.set(key, tags)
+            results = [tags if tags is not None else fetched_by_key.get(key) for key, tags in zip(keys, results)]
         
-        if "local food" in text or "local-food" in text:
-            matched_tags.add("local-food")
+        return [tags or [] for tags in results]
+    
+    def _fetch_llm_tags(self, pending: Dict[str, Dict[str, str]]) -> Dict[str, Optional[List[str]]]:
+        """Request LLM tags for uncached grants, packing several grants per prompt"""
+        results: Dict[str, Optional[List[str]]] = {}
+        batches = self._plan_llm_batches(list(pending.items()))
+        singles = [batch[0] for batch in batches if len(batch) == 1]
+        multi = [batch for batch in batches if len(batch) > 1]
+        
+        if multi:
+            replies = self.llm_pipeline.run(
+                lambda batch: self._request_llm_tags_multi([grant for _, grant in batch]),
+                multi
+            )
+            for batch, reply in zip(multi, replies):
+                for position, (key, grant) in enumerate(batch, start=1):
+                    if reply is None:
+                        # API failure after retries: rule-based tags only, so an
+                        # outage does not turn into one retried request per grant
+                        results[key] = None
+                    elif reply.get(f"g{position}") is None:
+                        # The reply left this grant out: ask for it on its own
+                        singles.append((key, grant))
+                    else:
+                        results[key] = reply[f"g{position}"]
         
-        if "nutrient management" in text or "nutrient-management" in text:
-            matched_tags.add("nutrient-management")
+        if singles:
+            fetched = self.llm_pipeline.run(
+                lambda item: self._request_llm_tags(item[1]['grant_name'], item[1]['grant_description']),
+                singles
+            )
+            results.update(zip([key for key, _ in singles], fetched))
         
-        if "organic transition" in text or "organic-transition" in text:
-            matched_tags.add("organic-transition")
+        return results
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token count (about four characters per token)"""
+        return len(text) // 4 + 1
+    
+    def _plan_llm_batches(self, items: List[Tuple[str, Dict[str, str]]]) -> List[List[Tuple[str, Dict[str, str]]]]:
+        """Greedily pack grants into prompts within the batch size and token budget"""
+        # Budget left after the shared instructions and tag vocabulary
+        preamble_tokens = self._estimate_tokens(', '.join(self.predefined_tags)) + 150
+        grant_budget = self.llm_prompt_token_budget - preamble_tokens
         
-        if "organic certification" in text or "organic-certification" in text:
-            matched_tags.add("organic-certification")
+        batches, current, used = [], [], 0
+        for item in items:
+            grant = item[1]
+            cost = self._estimate_tokens(grant['grant_name'] + grant['grant_description']) + 20
+            if current and (len(current) >= self.llm_batch_size or used + cost > grant_budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += cost
+        if current:
+            batches.append(current)
         
-        return list(matched_tags)
+        return batches
     
-    def _llm_tagging(self, grant_name: str, grant_description: str) -> List[str]:
-        """Use OpenAI to assign tags based on semantic understanding"""
-        if not self.openai_client:
-            return []
+    def _request_llm_tags_multi(self, grants: List[Dict[str, str]]) -> Dict[str, List[str]]:
+        """
+        Tag several grants with one LLM request.
+        
+        Grants are labelled g1..gN in the prompt and the reply is a JSON object
+        keyed by those IDs. API errors are raised. Grants missing from the reply
+        are left out of the result, and an unparseable (e.g. truncated) reply
+        yields an empty result so that every grant is requested on its own.
+        """
+        grant_entries = "\n".join(
+            f"""        [g{position}]
+        Grant Name: {grant['grant_name']}
+        Grant Description: {grant['grant_description']}
+"""
+            for position, grant in enumerate(grants, start=1)
+        )
         
+        prompt = f"""
+        Analyze each of the following grants and assign relevant tags from the predefined list.
+        
+{grant_entries}
+        Available Tags: {', '.join(self.predefined_tags)}
+        
+        For every grant return only the most relevant tags (3-8 tags).
+        Only use tags from the predefined list above.
+        Focus on the main themes and purposes of each grant.
+        
+        Return a single JSON object mapping each grant ID to its array of tags.
+        Example format: {{"g1": ["agriculture", "education"], "g2": ["water", "research"]}}
+        """
+        
+        response = self.openai_client.chat.completions.create(
+            model=self.llm_model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=80 * len(grants) + 50,
+            temperature=0.3
+        )
+        
+        # Parse the JSON response
+        tags_text = response.choices[0].message.content.strip()
+        # Remove markdown formatting if present
+        tags_text = tags_text.replace("```json", "").replace("```", "").strip()
+        
+        try:
+            parsed = json.loads(tags_text)
+        except ValueError:
+            parsed = None
+        if not isinstance(parsed, dict):
+            print(f"Warning: Unparseable batched LLM reply, tagging its grants one by one: {tags_text[:100]}")
+            return {}
+        
+        return {str(grant_id): tags for grant_id, tags in parsed.items() if isinstance(tags, list)}
+    
+    def _request_llm_tags(self, grant_name: str, grant_description: str) -> List[str]:
+        """Make a single LLM tagging request, raising on API or parse errors"""
         prompt = f"""
         Analyze this grant and assign relevant tags from the predefined list.
         
@@ -165,25 +435,20 @@ class GrantTaggingService:
         Example format: ["agriculture", "education", "research"]
         """
         
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=200,
-                temperature=0.3
-            )
-            
-            # Parse the JSON response
-            tags_text = response.choices[0].message.content.strip()
-            # Remove markdown formatting if present
-            tags_text = tags_text.replace("```json", "").replace("```", "").strip()
-            
-            tags = json.loads(tags_text)
-            return tags if isinstance(tags, list) else []
-            
-        except Exception as e:
-            print(f"Error in LLM tagging: {e}")
-            return []
+        response = self.openai_client.chat.completions.create(
+            model=self.llm_model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=200,
+            temperature=0.3
+        )
+        
+        # Parse the JSON response
+        tags_text = response.choices[0].message.content.strip()
+        # Remove markdown formatting if present
+        tags_text = tags_text.replace("```json", "").replace("```", "").strip()
+        
+        tags = json.loads(tags_text)
+        return tags if isinstance(tags, list) else []
     
     def get_available_tags(self) -> List[str]:
         """Return the list of available tags"""
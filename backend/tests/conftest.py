@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend modules the same way the app and scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Never reach a real LLM or MySQL server from the test suite
+os.environ.pop('OPENAI_API_KEY', None)
+os.environ.setdefault('DATABASE_URL', 'memory://')
+os.environ.setdefault('RESULT_CACHE_TTL', '0')
+
+
+@pytest.fixture
+def service():
+    """DatabaseService on a freshly created in-memory schema"""
+    from database_service import DatabaseService
+    from migrations import drop_schema
+
+    service = DatabaseService('memory://', setup=False)
+    # memory:// is shared by the whole process; start every test from an empty schema
+    drop_schema(service.engine)
+    service.setup()
+    yield service
+    service.tagging_service.shutdown()
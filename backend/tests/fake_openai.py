@@ -0,0 +1,101 @@
+"""Minimal OpenAI-compatible chat completions server for LLM tagging tests"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GRANT_ID_PATTERN = re.compile(r'\[(g\d+)\]')
+
+
+class FakeOpenAIServer:
+    """
+    Serves POST /v1/chat/completions on a local port.
+
+    Every reply tags grants with self.tags: a JSON array for single-grant
+    prompts, or an object keyed by the g1..gN IDs for batched prompts.
+    failures holds HTTP status codes returned, in order, before any success;
+    omit lists grant IDs left out of batched replies, and truncate cuts
+    batched replies short so they are not valid JSON.
+    """
+
+    def __init__(self, tags=('water',), delay=0.0, failures=(), omit=(), truncate=False):
+        self.tags = list(tags)
+        self.omit = set(omit)
+        self.truncate = truncate
+        self.delay = delay
+        self.failures = list(failures)
+        self.requests = []
+        self.request_times = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _reply(self, prompt):
+        grant_ids = GRANT_ID_PATTERN.findall(prompt)
+        if grant_ids:
+            reply = json.dumps({grant_id: self.tags for grant_id in grant_ids if grant_id not in self.omit})
+            return reply[:len(reply) // 2] if self.truncate else reply
+        return json.dumps(self.tags)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt = request['messages'][-1]['content']
+                with fake.lock:
+                    fake.requests.append(prompt)
+                    fake.request_times.append(time.monotonic())
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                    status = fake.failures.pop(0) if fake.failures else 200
+                try:
+                    time.sleep(fake.delay)
+                    if status != 200:
+                        self._send(status, {'error': {'message': f'fake error {status}', 'type': 'fake'}})
+                        return
+                    self._send(200, {
+                        'id': 'chatcmpl-fake',
+                        'object': 'chat.completion',
+                        'created': int(time.time()),
+                        'model': request.get('model', 'fake'),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': fake._reply(prompt)},
+                            'finish_reason': 'stop'
+                        }],
+                        'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}
+                    })
+                finally:
+                    with fake.lock:
+                        fake.in_flight -= 1
+
+        return Handler
@@ -0,0 +1,47 @@
+from sqlalchemy import event, func, select
+
+from models import Grant
+
+
+def grant(number):
+    return {'grant_name': f'Grant {number}', 'grant_description': f'Water quality research {number}'}
+
+
+def test_no_connection_is_held_while_tagging(service, monkeypatch):
+    checked_out = []
+    event.listen(service.engine, 'checkout', lambda *args: checked_out.append(1))
+    event.listen(service.engine, 'checkin', lambda *args: checked_out.pop())
+    during_tagging = []
+    assign_tags_batch = service.tagging_service.assign_tags_batch
+
+    def recording_assign_tags_batch(grants):
+        during_tagging.append(len(checked_out))
+        return assign_tags_batch(grants)
+
+    monkeypatch.setattr(service.tagging_service, 'assign_tags_batch', recording_assign_tags_batch)
+    result = service.add_grants([grant(1), grant(2)])
+
+    assert result['success']
+    assert during_tagging == [0]
+
+
+def test_content_stored_by_another_writer_during_tagging_is_a_duplicate(service, monkeypatch):
+    assign_tags_batch = service.tagging_service.assign_tags_batch
+
+    def racing_assign_tags_batch(grants):
+        tags = assign_tags_batch(grants)
+        monkeypatch.setattr(service.tagging_service, 'assign_tags_batch', assign_tags_batch)
+        assert service.add_grants([grant(2)])['success']
+        return tags
+
+    monkeypatch.setattr(service.tagging_service, 'assign_tags_batch', racing_assign_tags_batch)
+    result = service.add_grants([grant(1), grant(2), grant(3)])
+
+    assert result['success']
+    assert [added['grant_name'] for added in result['grants_added']] == ['Grant 1', 'Grant 3']
+    assert [duplicate['index'] for duplicate in result['duplicates']] == [1]
+    session = service.Session()
+    try:
+        assert session.scalar(select(func.count(Grant.id))) == 3
+    finally:
+        session.close()
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import event
+
+from bulk_ingest import bulk_insert_grants, load_tag_id_map
+from models import Grant
+
+
+@pytest.mark.parametrize('executemany_returning', [True, False])
+def test_grants_are_inserted_with_one_statement(service, monkeypatch, executemany_returning):
+    # False takes the path used on MySQL, which has no executemany RETURNING
+    monkeypatch.setattr(service.engine.dialect, 'insert_executemany_returning', executemany_returning)
+    statements = []
+    event.listen(service.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    grants = [{'grant_name': f'Grant {number}', 'grant_description': f'Research {number}'} for number in range(50)]
+    tag_names = [['water'] if number % 2 else ['education'] for number in range(50)]
+
+    session = service.Session()
+    try:
+        inserted = bulk_insert_grants(session, grants, tag_names, load_tag_id_map(session))
+        session.commit()
+        stored = {grant.id: (grant.grant_name, [tag.name for tag in grant.tags]) for grant in session.query(Grant)}
+    finally:
+        session.close()
+
+    assert len([statement for statement in statements if statement.startswith('INSERT INTO grants ')]) == 1
+    assert {grant['id']: (grant['grant_name'], grant['tags']) for grant in inserted} == stored
+    assert [grant['grant_name'] for grant in inserted] == [grant['grant_name'] for grant in grants]
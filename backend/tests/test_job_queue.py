@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue
+from worker import process_job
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.sqlite3'))
+
+
+class FakeDatabaseService:
+    """Stands in for DatabaseService.add_grants, assigning sequential ids"""
+
+    def __init__(self, delay=0.0, fail_on_call=None):
+        self.delay = delay
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.next_id = 1
+
+    def add_grants(self, batch):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError('database went away')
+        time.sleep(self.delay)
+        added = []
+        for _ in batch:
+            added.append({'id': self.next_id, 'tags': ['water']})
+            self.next_id += 1
+        return {'success': True, 'grants_added': added}
+
+
+def grants(count):
+    return [{'grant_name': f'Grant {number}', 'grant_description': 'Water'} for number in range(count)]
+
+
+def test_requeued_job_fences_the_previous_worker(queue):
+    job_id = queue.enqueue('grants', grants(3))
+    first = queue.claim('worker-1')
+    assert queue.requeue_stale(-1) == 1
+    second = queue.claim('worker-2')
+    assert second['lease'] != first['lease']
+
+    assert not queue.heartbeat(job_id, first['lease'])
+    assert not queue.update_progress(job_id, first['lease'], 3, {'added': 99})
+    assert not queue.complete(job_id, first['lease'], {'added': 99})
+    assert not queue.fail(job_id, first['lease'], 'late failure')
+
+    assert queue.update_progress(job_id, second['lease'], 2, {'added': 2})
+    assert queue.complete(job_id, second['lease'], {'added': 3})
+    job = queue.get(job_id)
+    assert job['status'] == 'completed'
+    assert job['result'] == {'added': 3}
+    assert 'lease' not in job
+
+
+def test_worker_stops_when_its_lease_is_lost(queue):
+    job_id = queue.enqueue('grants', grants(4))
+    job = queue.claim('worker-1')
+    db_service = FakeDatabaseService()
+
+    original = db_service.add_grants
+
+    def add_grants_then_lose_lease(batch):
+        result = original(batch)
+        if db_service.calls == 1:
+            queue.requeue_stale(-1)
+            queue.claim('worker-2')
+        return result
+
+    db_service.add_grants = add_grants_then_lose_lease
+    process_job(db_service, queue, job, batch_size=2, heartbeat_interval=10)
+
+    assert db_service.calls == 1
+    stored = queue.get(job_id)
+    assert stored['status'] == 'running'
+    assert stored['worker'] == 'worker-2'
+
+
+def test_heartbeat_keeps_a_slow_job_from_being_requeued(queue):
+    job_id = queue.enqueue('grants', grants(2))
+    job = queue.claim('worker-1')
+    stop = threading.Event()
+    requeued = []
+
+    def reaper():
+        while not stop.is_set():
+            requeued.append(queue.requeue_stale(0.3))
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=reaper)
+    thread.start()
+    try:
+        process_job(FakeDatabaseService(delay=0.8), queue, job, batch_size=2, heartbeat_interval=0.05)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert not any(requeued)
+    assert queue.get(job_id)['status'] == 'completed'
+
+
+def test_crash_keeps_the_partial_result(queue):
+    job_id = queue.enqueue('grants', grants(6))
+    job = queue.claim('worker-1')
+    process_job(FakeDatabaseService(fail_on_call=2), queue, job, batch_size=2, heartbeat_interval=10)
+
+    stored = queue.get(job_id)
+    assert stored['status'] == 'failed'
+    assert stored['error'] == 'database went away'
+    assert stored['processed'] == 2
+    assert stored['result'] == {'added': 2, 'grants': [{'id': 1, 'tags': ['water']}, {'id': 2, 'tags': ['water']}]}
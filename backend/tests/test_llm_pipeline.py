@@ -0,0 +1,118 @@
+import pytest
+
+from fake_openai import FakeOpenAIServer
+from llm_pipeline import LLMTaggingPipeline
+from tagging_service import GrantTaggingService
+
+
+def make_grants(count):
+    return [{'grant_name': f'Program {number}', 'grant_description': f'General support number {number}'}
+            for number in range(count)]
+
+
+@pytest.fixture
+def llm_service(monkeypatch):
+    """Build a tagging service talking to a fake server: llm_service(server, **pipeline_options)"""
+    services = []
+
+    def build(server, batch_size=1, **pipeline_options):
+        monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+        monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+        service = GrantTaggingService()
+        options = {'max_concurrency': 4, 'max_retries': 2, 'backoff': 0.01}
+        options.update(pipeline_options)
+        service.llm_pipeline = LLMTaggingPipeline(**options)
+        service.llm_batch_size = batch_size
+        services.append(service)
+        return service
+
+    yield build
+    for service in services:
+        service.shutdown()
+
+
+def test_requests_run_concurrently_within_the_limit(llm_service):
+    with FakeOpenAIServer(delay=0.1) as server:
+        service = llm_service(server, max_concurrency=4)
+        results = service.assign_tags_batch(make_grants(12))
+
+    assert len(server.requests) == 12
+    assert 1 < server.max_in_flight <= 4
+    assert all('water' in tags for tags in results)
+
+
+def test_transient_errors_are_retried(llm_service):
+    with FakeOpenAIServer(failures=[429, 503]) as server:
+        service = llm_service(server)
+        tags = service.assign_tags('Program', 'General support')
+
+    assert len(server.requests) == 3
+    assert 'water' in tags
+
+
+@pytest.mark.parametrize('status', [400, 401, 404])
+def test_client_errors_are_not_retried(llm_service, status):
+    with FakeOpenAIServer(failures=[status] * 5) as server:
+        service = llm_service(server)
+        tags = service.assign_tags('Program', 'General support')
+
+    assert len(server.requests) == 1
+    assert 'water' not in tags
+
+
+def test_requests_are_rate_limited(llm_service):
+    with FakeOpenAIServer() as server:
+        service = llm_service(server, requests_per_second=10)
+        service.assign_tags_batch(make_grants(15))
+
+    # The bucket starts with 10 tokens; the other 5 requests wait about 0.1s each
+    assert len(server.request_times) == 15
+    assert max(server.request_times) - min(server.request_times) >= 0.4
+
+
+def test_grants_share_a_batched_prompt(llm_service):
+    with FakeOpenAIServer() as server:
+        service = llm_service(server, batch_size=10)
+        results = service.assign_tags_batch(make_grants(5))
+
+    assert len(server.requests) == 1
+    assert all('water' in tags for tags in results)
+
+
+def test_failed_batch_is_not_split_into_per_grant_requests(llm_service):
+    with FakeOpenAIServer(failures=[503] * 10) as server:
+        service = llm_service(server, batch_size=10, max_retries=2)
+        results = service.assign_tags_batch(make_grants(5))
+
+    # One batched request plus its two retries, then rule-based tags only
+    assert len(server.requests) == 3
+    assert not any('water' in tags for tags in results)
+
+
+def test_grants_missing_from_a_batched_reply_are_requested_individually(llm_service):
+    with FakeOpenAIServer(omit=['g2', 'g4']) as server:
+        service = llm_service(server, batch_size=10)
+        results = service.assign_tags_batch(make_grants(5))
+
+    assert len(server.requests) == 3
+    assert all('water' in tags for tags in results)
+
+
+def test_cached_results_skip_the_server(llm_service):
+    with FakeOpenAIServer() as server:
+        service = llm_service(server)
+        first = service.assign_tags_batch(make_grants(3))
+        second = service.assign_tags_batch(make_grants(3))
+
+    assert len(server.requests) == 3
+    assert [sorted(tags) for tags in first] == [sorted(tags) for tags in second]
+
+
+def test_grants_in_an_unparseable_batched_reply_are_requested_individually(llm_service):
+    with FakeOpenAIServer(truncate=True) as server:
+        service = llm_service(server, batch_size=10)
+        results = service.assign_tags_batch(make_grants(5))
+
+    # The truncated batched reply is not retried as a batch; each grant gets its own request
+    assert len(server.requests) == 6
+    assert all('water' in tags for tags in results)
@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, insert, select
+
+from models import Grant
+
+
+def test_sessions_in_other_threads_do_not_see_uncommitted_writes(service):
+    inserted = threading.Event()
+    counts = []
+
+    def writer():
+        session = service.Session()
+        try:
+            session.execute(insert(Grant).values(grant_name='Draft', grant_description='Uncommitted'))
+            inserted.set()
+            threading.Event().wait(0.2)
+            session.rollback()
+        finally:
+            session.close()
+
+    def reader():
+        inserted.wait()
+        session = service.Session()
+        try:
+            counts.append(session.scalar(select(func.count(Grant.id))))
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counts == [0]
+
+
+def test_concurrent_ingest_and_reads(service):
+    def ingest(worker):
+        grants = [{'grant_name': f'Grant {worker}-{number}', 'grant_description': f'Water research {worker} {number}'}
+                  for number in range(20)]
+        return service.add_grants(grants)['success']
+
+    def read(_):
+        return service.get_all_grants(limit=10)['success']
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(ingest, range(4))) + list(executor.map(read, range(20)))
+
+    assert all(results)
+    assert service.get_all_grants(include_total=True)['total'] == 80
@@ -0,0 +1,40 @@
+import json
+import time
+
+import app
+import metrics
+
+STREAM_LABELS = ('/api/grants/stream', 'POST')
+
+
+class SlowIngestService:
+    """Stands in for DatabaseService; each batch takes delay seconds to ingest"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def add_grants(self, grants):
+        time.sleep(self.delay)
+        added = [{'id': number, 'tags': []} for number, _ in enumerate(grants, start=1)]
+        return {'success': True, 'grants_added': added, 'duplicates': []}
+
+
+def latency(labels):
+    counts, total = metrics.HTTP_LATENCY.values.get(labels, [[0], 0.0])
+    return sum(counts), total
+
+
+def test_streamed_request_latency_covers_the_body(monkeypatch):
+    monkeypatch.setattr(app, 'db_service', SlowIngestService(delay=0.2))
+    count_before, total_before = latency(STREAM_LABELS)
+    body = '\n'.join(json.dumps({'grant_name': f'Grant {n}', 'grant_description': 'Water'}) for n in range(3))
+
+    response = app.app.test_client().post('/api/grants/stream', data=body, buffered=False)
+    assert latency(STREAM_LABELS)[0] == count_before
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+
+    count_after, total_after = latency(STREAM_LABELS)
+    assert lines[-1]['summary']['added'] == 3
+    assert count_after == count_before + 1
+    assert total_after - total_before >= 0.2
@@ -0,0 +1,59 @@
+from sqlalchemy import Column, Index, MetaData, String, Table, create_engine, inspect, text
+
+from migrations import _declared_index, _ensure_index, run_migrations
+from models import Grant
+
+
+def content_hash_indexes(engine):
+    return [(index['name'], bool(index['unique'])) for index in inspect(engine).get_indexes('grants')
+            if index['column_names'] == ['content_hash']]
+
+
+def old_schema_engine(tmp_path):
+    """A database created before content hashes, by create_tables alone"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'grants.sqlite3'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE grants (id INTEGER PRIMARY KEY, grant_name VARCHAR(255) NOT NULL, "
+            "grant_description TEXT NOT NULL, created_at DATETIME, updated_at DATETIME, content_hash VARCHAR(64))"
+        ))
+    return engine
+
+
+def test_non_unique_index_does_not_stand_in_for_unique(tmp_path):
+    engine = old_schema_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX ix_legacy_hash ON grants (content_hash)"))
+        _ensure_index(connection, _declared_index(Grant.__table__, 'ux_grants_content_hash'))
+
+    assert ('ux_grants_content_hash', True) in content_hash_indexes(engine)
+
+
+def test_same_named_non_unique_index_is_recreated_unique(tmp_path):
+    engine = old_schema_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX ux_grants_content_hash ON grants (content_hash)"))
+        _ensure_index(connection, _declared_index(Grant.__table__, 'ux_grants_content_hash'))
+
+    assert [unique for name, unique in content_hash_indexes(engine) if name == 'ux_grants_content_hash'] == [True]
+
+
+def test_existing_unique_index_is_reused(tmp_path):
+    engine = old_schema_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE UNIQUE INDEX ux_legacy_hash ON grants (content_hash)"))
+        _ensure_index(connection, _declared_index(Grant.__table__, 'ux_grants_content_hash'))
+        # A unique index also serves a plain lookup index on the same columns
+        # (declared on a separate Table so the model metadata is left alone)
+        grants = Table('grants', MetaData(), Column('content_hash', String(64)))
+        _ensure_index(connection, Index('ix_lookup_hash', grants.c.content_hash))
+
+    assert [name for name, _ in content_hash_indexes(engine)] == ['ux_legacy_hash']
+
+
+def test_migrations_are_idempotent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.sqlite3'}")
+    first = run_migrations(engine)
+    assert first
+    assert run_migrations(engine) == []
+    assert [unique for name, unique in content_hash_indexes(engine)] == [True]
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from models import Grant
+
+
+@pytest.fixture
+def seeded(service):
+    grants = [{'grant_name': f'Grant {number:02d}', 'grant_description': f'Water research {number}'}
+              for number in range(10)]
+    assert service.add_grants(grants)['success']
+    # Rows written before created_at had a default, plus ties on the sort column
+    with service.engine.begin() as connection:
+        connection.execute(update(Grant).where(Grant.id.in_([2, 5, 9])).values(created_at=None))
+        connection.execute(update(Grant).where(Grant.id.in_([3, 4])).values(created_at=datetime(2024, 1, 1)))
+    return service
+
+
+def walk_pages(service, sort, limit=3):
+    ids, after_id = [], None
+    while True:
+        page = service.get_all_grants(after_id=after_id, limit=limit, sort=sort, include_total=False)
+        assert page['success'], page
+        ids += [grant['id'] for grant in page['grants']]
+        after_id = page['next_after_id']
+        if after_id is None:
+            return ids
+
+
+@pytest.mark.parametrize('sort', ['id', '-id', 'created_at', '-created_at', 'grant_name', '-grant_name'])
+def test_pages_cover_every_grant_in_listing_order(seeded, sort):
+    full = [grant['id'] for grant in seeded.get_all_grants(sort=sort)['grants']]
+    assert sorted(full) == list(range(1, 11))
+    assert walk_pages(seeded, sort) == full
+
+
+def test_null_sort_values_sort_lowest(seeded):
+    ascending = [grant['id'] for grant in seeded.get_all_grants(sort='created_at')['grants']]
+    assert ascending[:3] == [2, 5, 9]
+    descending = [grant['id'] for grant in seeded.get_all_grants(sort='-created_at')['grants']]
+    assert descending[-3:] == [9, 5, 2]
+
+
+def test_unknown_after_id_is_a_bad_request(seeded, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'db_service', seeded)
+    client = app.app.test_client()
+    for sort in ('created_at', '-created_at', 'grant_name'):
+        response = client.get(f'/api/grants?after_id=99999&limit=5&sort={sort}')
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Unknown after_id: 99999'
+    assert client.get('/api/grants?after_id=99999&limit=5&sort=id').status_code == 200
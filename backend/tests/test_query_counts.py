@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def count_queries(service):
+    """Return a callable running func() and giving the number of SQL statements it issued"""
+    def count(func):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(service.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            func()
+        finally:
+            event.remove(service.engine, 'before_cursor_execute', before_cursor_execute)
+        return len(statements)
+
+    return count
+
+
+def seed(service, start, count):
+    grants = [{
+        'grant_name': f'Water conservation program {number}',
+        'grant_description': f'Soil and water research with farmer education, round {number}.'
+    } for number in range(start, start + count)]
+    assert service.add_grants(grants)['success']
+
+
+@pytest.mark.parametrize('call', [
+    lambda service: service.get_all_grants(),
+    lambda service: service.get_all_grants(limit=20),
+    lambda service: service.search_grants_by_tags(['water', 'education']),
+], ids=['get_all_grants', 'get_all_grants_page', 'search_grants_by_tags'])
+def test_query_count_does_not_grow_with_grants(service, count_queries, call):
+    seed(service, 0, 5)
+    small = count_queries(lambda: call(service))
+    seed(service, 5, 45)
+    large = count_queries(lambda: call(service))
+
+    assert small == large
+    assert small <= 4
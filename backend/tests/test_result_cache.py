@@ -0,0 +1,83 @@
+import pytest
+
+from result_cache import ResultCache
+from serialization import dumps
+
+
+def listing():
+    return {'success': True, 'grants': [{'id': 1, 'tags': ['water']}], 'total': 1}
+
+
+def test_hits_share_one_frozen_result():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    first = cache.get_or_compute('grants', listing)
+    second = cache.get_or_compute('grants', lambda: pytest.fail('should be cached'))
+
+    assert second is first
+    with pytest.raises(TypeError):
+        first['grants'][0]['tags'] = []
+    with pytest.raises((TypeError, AttributeError)):
+        first['grants'][0]['tags'].append('soil')
+    # Copies are mutable and the encoded form is unchanged
+    copy = dict(first)
+    copy['total'] = 2
+    assert dumps(first) == dumps(listing())
+
+
+def test_writes_invalidate_cached_results():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    before = cache.get_or_compute('grants', listing)
+    cache.bump_generation()
+
+    assert cache.get_or_compute('grants', listing) is not before
+
+
+def test_failures_are_not_cached():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    cache.get_or_compute('grants', lambda: {'success': False, 'error': 'boom'})
+    assert cache.get_or_compute('grants', listing)['success']
+
+
+def test_api_answers_304_for_a_cached_listing(service, monkeypatch):
+    import app
+
+    service.result_cache = ResultCache(max_entries=8, ttl_seconds=60)
+    assert service.add_grants([{'grant_name': 'Water grant', 'grant_description': 'Soil research'}])['success']
+    monkeypatch.setattr(app, 'db_service', service)
+    client = app.app.test_client()
+
+    first = client.get('/api/grants')
+    assert first.status_code == 200 and first.get_json()['count'] == 1
+    cached = client.get('/api/grants', headers={'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
+
+    assert service.add_grants([{'grant_name': 'Second grant', 'grant_description': 'Energy'}])['success']
+    changed = client.get('/api/grants', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200 and changed.get_json()['count'] == 2
+
+
+@pytest.mark.parametrize('ttl_seconds', [0, 60])
+def test_etag_depends_only_on_the_content(service, monkeypatch, ttl_seconds):
+    import app
+
+    assert service.add_grants([{'grant_name': 'Water grant', 'grant_description': 'Soil research'}])['success']
+    monkeypatch.setattr(app, 'db_service', service)
+    client = app.app.test_client()
+
+    service.result_cache = ResultCache(max_entries=8, ttl_seconds=ttl_seconds)
+    first = client.get('/api/grants')
+    # A new cache (another worker process, or after expiry) serves the same ETag for the same content
+    service.result_cache = ResultCache(max_entries=8, ttl_seconds=ttl_seconds)
+    second = client.get('/api/grants', headers={'Accept-Encoding': 'gzip'})
+
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert client.get('/api/grants', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+
+def test_equivalent_tag_queries_share_a_cache_entry(service):
+    service.result_cache = ResultCache(max_entries=8, ttl_seconds=60)
+    first = service.search_grants_by_query('water AND (education OR research)')
+    second = service.search_grants_by_query('(research or EDUCATION) and water AND water')
+
+    assert second is first
+    assert service.result_cache.stats()['misses'] == 1
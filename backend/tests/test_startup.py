@@ -0,0 +1,36 @@
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('database_url, configured, expected', [
+    ('sqlite:///grants.sqlite3', None, False),
+    ('mysql+pymysql://user:password@db/grants', None, False),
+    ('memory://', None, True),
+    ('sqlite:///grants.sqlite3', 'TRUE', True),
+    ('memory://', 'FALSE', False),
+])
+def test_schema_setup_on_first_request(monkeypatch, database_url, configured, expected):
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    if configured is None:
+        monkeypatch.delenv('DB_AUTO_SETUP', raising=False)
+    else:
+        monkeypatch.setenv('DB_AUTO_SETUP', configured)
+
+    assert app.auto_setup_enabled() is expected
+
+
+def test_health_reports_an_unreachable_database(monkeypatch, tmp_path):
+    from database_service import DatabaseService
+
+    unreachable = DatabaseService(f"sqlite:///{tmp_path}/missing/grants.sqlite3", setup=False)
+    monkeypatch.setattr(app, 'db_service', unreachable)
+    try:
+        assert app.app.test_client().get('/api/health').get_json()['database'] == 'disconnected'
+    finally:
+        unreachable.tagging_service.shutdown()
+
+
+def test_health_reports_a_reachable_database(monkeypatch, service):
+    monkeypatch.setattr(app, 'db_service', service)
+    assert app.app.test_client().get('/api/health').get_json()['database'] == 'connected'
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import event, select
+
+from database_service import DatabaseService
+from models import Grant, Tag, grant_tags
+
+
+def seed(service, count=40):
+    grants = [{'grant_name': f'Program {number}',
+               'grant_description': ['Water and soil research', 'Education outreach for farmers',
+                                     'Drought water education', 'Arts program'][number % 4] + f' {number}'}
+              for number in range(count)]
+    assert service.add_grants(grants)['success']
+
+
+def naive_facets(service, selected):
+    """Facet counts computed in Python from every grant's tags"""
+    with service.engine.connect() as connection:
+        tags_by_grant = {grant_id: set() for (grant_id,) in connection.execute(select(Grant.id))}
+        for grant_id, tag_name in connection.execute(select(grant_tags.c.grant_id, Tag.name).join(Tag)):
+            tags_by_grant[grant_id].add(tag_name)
+    selection = [tags for tags in tags_by_grant.values() if set(selected) <= tags]
+    tag_names = service.tagging_service.get_available_tags()
+    return {tag_name: sum(tag_name in tags for tags in selection) for tag_name in tag_names}, len(selection)
+
+
+@pytest.mark.parametrize('use_tag_index', [False, True])
+@pytest.mark.parametrize('selected', [[], ['water'], ['water', 'education']])
+def test_facets_match_the_stored_tags(service, use_tag_index, selected):
+    service.use_tag_index = use_tag_index
+    seed(service)
+    service.get_tag_facets()
+    # Incremental updates after the structure is built
+    seed(service, 50)
+
+    result = service.get_tag_facets(selected)
+
+    assert (result['facets'], result['total']) == naive_facets(service, selected)
+
+
+def test_default_facets_do_not_group_by_per_request(service):
+    seed(service)
+    service.get_tag_facets()
+    statements = []
+    event.listen(service.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    service.get_tag_facets()
+    service.get_tag_facets(['water'])
+
+    assert not [statement for statement in statements if 'GROUP BY' in statement]
+
+
+def test_facets_pick_up_writes_from_another_process(service):
+    seed(service)
+    before = service.get_tag_facets(['water'])['total']
+    other = DatabaseService('memory://', setup=False)
+    try:
+        assert other.add_grants([{'grant_name': 'Worker grant', 'grant_description': 'Water rights'}])['success']
+    finally:
+        other.tagging_service.shutdown()
+
+    assert service.get_tag_facets(['water'])['total'] == before + 1
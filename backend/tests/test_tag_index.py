@@ -0,0 +1,91 @@
+import random
+
+from sqlalchemy import select
+
+from models import Grant, Tag, grant_tags
+from tag_index import TagBitmapIndex
+from tag_query import parse_tag_query
+
+
+def naive_bitmaps(service):
+    """Bitmaps built one row at a time, the obvious way"""
+    with service.engine.connect() as connection:
+        universe = 0
+        for (grant_id,) in connection.execute(select(Grant.id)):
+            universe |= 1 << grant_id
+        bitmaps = {}
+        rows = connection.execute(select(Tag.name, grant_tags.c.grant_id).join(grant_tags))
+        for tag_name, grant_id in rows:
+            bitmaps[tag_name] = bitmaps.get(tag_name, 0) | (1 << grant_id)
+    return universe, bitmaps
+
+
+def seed(service, count):
+    grants = [{'grant_name': f'Program {number}',
+               'grant_description': f'Water soil education research farmer drought {number}'[:20 + number % 40]}
+              for number in range(count)]
+    assert service.add_grants(grants)['success']
+
+
+def test_rebuild_matches_row_by_row_bitmaps(service):
+    seed(service, 60)
+    session = service.Session()
+    try:
+        index = TagBitmapIndex.build(session)
+    finally:
+        session.close()
+
+    universe, bitmaps = naive_bitmaps(service)
+    assert index.universe == universe
+    assert index.bitmaps == bitmaps
+
+
+def test_incremental_updates_match_a_rebuild(service):
+    seed(service, 40)
+    session = service.Session()
+    try:
+        index = TagBitmapIndex.build(session)
+        rng = random.Random(7)
+        added = [(grant_id, rng.sample(['water', 'soil', 'youth', 'energy'], 2)) for grant_id in range(100, 140)]
+        index.add_grants(added)
+        index.add_grant(500, ['water'])
+        index.remove_grant(105, added[5][1])
+        index.remove_grant(3)
+
+        assert TagBitmapIndex.bitmap_to_ids(index.bitmaps['youth']) == sorted(
+            grant_id for grant_id, tags in added if 'youth' in tags and grant_id != 105
+        )
+        assert 105 not in TagBitmapIndex.bitmap_to_ids(index.universe)
+        assert 3 not in TagBitmapIndex.bitmap_to_ids(index.universe)
+        assert 500 in index.search(parse_tag_query('water'))
+    finally:
+        session.close()
+
+
+def test_ids_to_bitmap():
+    assert TagBitmapIndex.ids_to_bitmap([]) == 0
+    ids = [0, 7, 8, 63, 64, 1000, 99999]
+    assert TagBitmapIndex.bitmap_to_ids(TagBitmapIndex.ids_to_bitmap(reversed(ids))) == ids
+
+
+def test_index_picks_up_writes_from_another_process(service):
+    from database_service import DatabaseService
+
+    service.use_tag_index = True
+    seed(service, 10)
+    before = service.search_grants_by_query('water')['grants']
+    facets_before = service.get_tag_facets()['total']
+    # A second service stands in for another process (the ingest worker or another API worker)
+    other = DatabaseService('memory://', setup=False)
+    try:
+        added = other.add_grants([{'grant_name': 'Worker grant', 'grant_description': 'Water rights study'}])
+        assert added['success']
+        new_id = added['grants_added'][0]['id']
+        assert new_id in {grant['id'] for grant in service.search_grants_by_query('water')['grants']}
+        assert len(service.search_grants_by_query('water')['grants']) == len(before) + 1
+        assert service.get_tag_facets()['total'] == facets_before + 1
+
+        assert other.delete_grant(new_id)['success']
+        assert new_id not in {grant['id'] for grant in service.search_grants_by_query('water')['grants']}
+    finally:
+        other.tagging_service.shutdown()
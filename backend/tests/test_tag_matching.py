@@ -0,0 +1,102 @@
+import json
+import os
+import random
+
+import pytest
+
+from tagging_service import GrantTaggingService
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'grants.json')
+
+COMPOUND_TERMS = [
+    ("farm to school", "farm-to-school"),
+    ("local food", "local-food"),
+    ("nutrient management", "nutrient-management"),
+    ("organic transition", "organic-transition"),
+    ("organic certification", "organic-certification"),
+]
+
+
+def baseline_string_matching_tags(service, text):
+    """The original per-tag `in` scan that the compiled matcher replaced"""
+    matched_tags = set()
+    for tag in service.predefined_tags:
+        if tag.replace("-", " ") in text or tag in text:
+            matched_tags.add(tag)
+    for tag, keywords in service.keyword_mappings.items():
+        for keyword in keywords:
+            if keyword in text:
+                matched_tags.add(tag)
+    for spaced, hyphenated in COMPOUND_TERMS:
+        if spaced in text or hyphenated in text:
+            matched_tags.add(hyphenated)
+    return sorted(matched_tags)
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = GrantTaggingService(match_mode='substring')
+    yield service
+    service.shutdown()
+
+
+def test_matches_baseline_on_sample_grants(service):
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        grants = json.load(f)
+    for grant in grants:
+        text = f"{grant['grant_name']} {grant['grant_description']}".lower()
+        assert sorted(service._string_matching_tags(text)) == baseline_string_matching_tags(service, text)
+
+
+def test_matches_baseline_on_random_texts(service):
+    rng = random.Random(1234)
+    vocabulary = list(service.predefined_tags)
+    vocabulary += [tag.replace('-', ' ') for tag in service.predefined_tags if '-' in tag]
+    vocabulary += [keyword for keywords in service.keyword_mappings.values() for keyword in keywords]
+    vocabulary += [term for pair in COMPOUND_TERMS for term in pair]
+    filler = ['the', 'and', 'of', 'program', 'a', 'to', 'for', '-', 'x', 'in']
+
+    for _ in range(2000):
+        words = [rng.choice(vocabulary if rng.random() < 0.5 else filler) for _ in range(rng.randint(1, 12))]
+        # Join without spaces now and then so keywords overlap and run into each other
+        text = ''.join(word + rng.choice([' ', ' ', '-', '']) for word in words).lower()
+        assert sorted(service._string_matching_tags(text)) == baseline_string_matching_tags(service, text), text
+
+
+def test_parallel_tagging_matches_in_process(monkeypatch):
+    monkeypatch.setenv('PARALLEL_TAGGING_THRESHOLD', '4')
+    monkeypatch.setenv('TAGGING_WORKERS', '2')
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        grants = json.load(f)
+    parallel = GrantTaggingService(match_mode='substring')
+    serial = GrantTaggingService(match_mode='substring')
+    serial.tagging_workers = 1
+    try:
+        assert [sorted(tags) for tags in parallel.assign_tags_batch(grants)] == \
+            [sorted(tags) for tags in serial.assign_tags_batch(grants)]
+        assert parallel._process_pool is not None
+    finally:
+        parallel.shutdown()
+
+
+def test_broken_process_pool_falls_back_in_process(monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+
+    class BrokenPool:
+        def map(self, func, chunks):
+            raise BrokenProcessPool('workers could not start')
+
+        def shutdown(self):
+            pass
+
+    monkeypatch.setenv('PARALLEL_TAGGING_THRESHOLD', '2')
+    monkeypatch.setenv('TAGGING_WORKERS', '2')
+    service = GrantTaggingService(match_mode='substring')
+    service._process_pool = BrokenPool()
+    grants = [{'grant_name': 'Water grant', 'grant_description': f'Soil research {number}'} for number in range(5)]
+
+    results = service.assign_tags_batch(grants)
+
+    assert all('water' in tags and 'soil' in tags for tags in results)
+    assert service.tagging_workers == 1
+    assert service._process_pool is None
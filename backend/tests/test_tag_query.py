@@ -0,0 +1,104 @@
+import random
+
+import pytest
+from sqlalchemy import select
+
+from models import Grant, Tag, grant_tags
+from tag_index import TagBitmapIndex
+from tag_query import (AndExpr, NotExpr, OrExpr, TagQueryError, TagTerm, all_of, canonical_tag_query,
+                       compile_tag_query, parse_tag_query)
+
+TAGS = ['water', 'soil', 'education', 'research', 'drought']
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('water', TagTerm('water')),
+    ('Water', TagTerm('water')),
+    ('water AND soil OR education',
+     OrExpr((AndExpr((TagTerm('water'), TagTerm('soil'))), TagTerm('education')))),
+    ('water OR soil AND education',
+     OrExpr((TagTerm('water'), AndExpr((TagTerm('soil'), TagTerm('education')))))),
+    ('water AND (soil OR education)',
+     AndExpr((TagTerm('water'), OrExpr((TagTerm('soil'), TagTerm('education')))))),
+    ('NOT water AND soil', AndExpr((NotExpr(TagTerm('water')), TagTerm('soil')))),
+    ('NOT (water AND soil)', NotExpr(AndExpr((TagTerm('water'), TagTerm('soil'))))),
+    ('NOT NOT water', NotExpr(NotExpr(TagTerm('water')))),
+    ('(water AND soil) AND drought', AndExpr((TagTerm('water'), TagTerm('soil'), TagTerm('drought')))),
+    ('((water))', TagTerm('water')),
+    ('farm-to-school or local_food', OrExpr((TagTerm('farm-to-school'), TagTerm('local_food')))),
+])
+def test_precedence_and_parentheses(expression, expected):
+    assert parse_tag_query(expression) == expected
+
+
+@pytest.mark.parametrize('expression', [
+    '',
+    '   ',
+    '(water AND soil',
+    'water AND soil)',
+    '()',
+    'water AND',
+    'OR water',
+    'water OR OR soil',
+    'water soil',
+    'NOT',
+    'water AND NOT',
+    'NOT ()',
+    'water $ soil',
+])
+def test_malformed_expressions_are_rejected(expression):
+    with pytest.raises(TagQueryError):
+        parse_tag_query(expression)
+
+
+def test_canonical_form_ignores_order_repeats_and_nesting():
+    assert canonical_tag_query(parse_tag_query('water AND (drought AND water)')) == 'AND(drought,water)'
+    assert (canonical_tag_query(parse_tag_query('soil OR NOT (water AND drought)'))
+            == canonical_tag_query(parse_tag_query('NOT (drought AND water) OR soil')))
+    assert canonical_tag_query(all_of(['water'])) == 'water'
+    assert canonical_tag_query(None) == ''
+
+
+def random_expression(rng, depth=0):
+    if depth >= 3 or rng.random() < 0.3:
+        return rng.choice(TAGS)
+    kind = rng.choice(['AND', 'OR', 'NOT', 'AND', 'OR'])
+    if kind == 'NOT':
+        return f"NOT {random_expression(rng, depth + 1)}"
+    parts = [random_expression(rng, depth + 1) for _ in range(rng.randint(2, 3))]
+    return '(' + f" {kind} ".join(parts) + ')'
+
+
+def matches(node, tags):
+    """Evaluate an expression tree against one grant's tag set"""
+    if isinstance(node, TagTerm):
+        return node.name in tags
+    if isinstance(node, NotExpr):
+        return not matches(node.child, tags)
+    results = [matches(child, tags) for child in node.children]
+    return all(results) if isinstance(node, AndExpr) else any(results)
+
+
+def test_sql_and_bitmap_results_agree(service):
+    rng = random.Random(7)
+    grants = [{'grant_name': f'Grant {number}',
+               'grant_description': ' '.join(rng.sample(TAGS, rng.randint(0, 4))) + f' program {number}'}
+              for number in range(120)]
+    assert service.add_grants(grants)['success']
+
+    session = service.Session()
+    try:
+        tags_by_grant = {grant_id: set() for grant_id in session.scalars(select(Grant.id))}
+        for grant_id, tag_name in session.execute(select(grant_tags.c.grant_id, Tag.name).join(Tag)):
+            tags_by_grant[grant_id].add(tag_name)
+        tag_index = TagBitmapIndex.build(session)
+
+        expressions = [random_expression(rng) for _ in range(60)] + ['NOT water', 'water AND NOT water', 'unknown']
+        for expression in expressions:
+            node = parse_tag_query(expression)
+            from_sql = sorted(session.scalars(select(Grant.id).where(compile_tag_query(node))))
+            expected = sorted(grant_id for grant_id, tags in tags_by_grant.items() if matches(node, tags))
+            assert from_sql == expected, expression
+            assert tag_index.search(node) == expected, expression
+    finally:
+        session.close()
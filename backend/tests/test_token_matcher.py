@@ -0,0 +1,41 @@
+import pytest
+
+from tag_matcher import TokenMatcher
+from tagging_service import GrantTaggingService
+
+PATTERNS = {
+    'co': ['co'],
+    'wi': ['wi'],
+    'farm': ['agriculture'],
+    'farm to school': ['farm-to-school'],
+    'water': ['water'],
+    'water quality': ['water-quality'],
+}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Grants for Colorado (CO) farms', {'co'}),
+    ('Wisconsin dairy cooperative', set()),
+    ('A farmer co-op in Kentucky', set()),
+    ('Co-operative extension', set()),
+    ('Wi-Fi for rural libraries', set()),
+    ('Farm-to-school pilot', {'farm-to-school'}),
+    ('farm to school pilot', {'farm-to-school'}),
+    ('Farm to School and farm stands', {'farm-to-school', 'agriculture'}),
+    ('Water quality monitoring', {'water-quality'}),
+    ('Clean water; water quality', {'water', 'water-quality'}),
+    ('co - op and WI', {'co', 'wi'}),
+    ('', set()),
+])
+def test_token_matches(text, expected):
+    assert TokenMatcher(PATTERNS).match(text) == expected
+
+
+def test_token_mode_skips_state_abbreviations_inside_words_and_compounds():
+    service = GrantTaggingService(match_mode='token')
+    try:
+        tags = set(service.assign_tags('Rural co-op support', 'Funding for a farmer co-op in Wisconsin'))
+        assert {'co', 'wi'}.isdisjoint(tags)
+        assert 'co' in service.assign_tags('Colorado water grant', 'Open to applicants in CO only')
+    finally:
+        service.shutdown()
@@ -0,0 +1,76 @@
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from text_utils import tokenize
+
+
+class BM25Index:
+    """
+    Pure-Python BM25 inverted index over grant names and descriptions.
+
+    Used for full-text search when the database has no native full-text
+    index (SQLite and other local or test backends). Postings map each term
+    to {grant_id: term frequency}; scoring only touches the postings of the
+    query terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_terms: Dict[int, Counter] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add_document(self, doc_id: int, text: str):
+        """Index (or re-index) a document"""
+        terms = Counter(tokenize(text))
+        with self.lock:
+            self.remove_document(doc_id)
+            self.doc_terms[doc_id] = terms
+            self.doc_lengths[doc_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[doc_id]
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = frequency
+
+    def remove_document(self, doc_id: int):
+        """Drop a document from the index if present"""
+        with self.lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            self.total_length -= self.doc_lengths.pop(doc_id)
+            for term in terms:
+                documents = self.postings.get(term)
+                if documents is not None:
+                    documents.pop(doc_id, None)
+                    if not documents:
+                        del self.postings[term]
+
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs for documents matching any query term, best first"""
+        with self.lock:
+            document_count = len(self.doc_lengths)
+            if not document_count:
+                return []
+            average_length = self.total_length / document_count
+
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                documents = self.postings.get(term)
+                if not documents:
+                    continue
+                idf = math.log(1 + (document_count - len(documents) + 0.5) / (len(documents) + 0.5))
+                for doc_id, frequency in documents.items():
+                    length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / average_length
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (
+                        frequency + self.k1 * length_norm
+                    )
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
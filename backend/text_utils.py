@@ -0,0 +1,22 @@
+import hashlib
+import re
+from typing import List
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse runs of whitespace"""
+    return WHITESPACE_PATTERN.sub(" ", (text or "").lower()).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def content_hash(grant_name: str, grant_description: str) -> str:
+    """Stable SHA-256 hex digest of a grant's normalized name and description"""
+    normalized = f"{normalize_text(grant_name)}\x1f{normalize_text(grant_description)}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Background worker that drains the grant ingest job queue.
+
+Run one or more copies next to the API:
+    python worker.py            # keep polling for jobs
+    python worker.py --once     # process queued jobs, then exit
+"""
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from database_service import DatabaseService
+from job_queue import JobQueue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Heartbeat:
+    """Keeps a claimed job's lease fresh from a background thread while a batch runs"""
+    
+    def __init__(self, queue, job, interval):
+        self.queue = queue
+        self.job = job
+        self.interval = interval
+        self.lost = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"heartbeat-{job['id']}", daemon=True)
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+    
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job['id'], self.job['lease']):
+                    self.lost.set()
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {self.job['id']} failed: {e}")
+
+def process_job(db_service, queue, job, batch_size, heartbeat_interval=60.0):
+    """
+    Tag and insert a job's grants in batches, recording progress after each.
+    
+    A requeued job resumes after the last batch it committed. Processing
+    stops as soon as the job's lease is lost (it was requeued as stale and
+    may now belong to another worker); errors fail the job with the partial
+    result ingested so far.
+    """
+    grants = job['payload']
+    added = job['result']['grants'] if job['result'] else []
+    job_id, lease = job['id'], job['lease']
+    
+    def partial():
+        return {'added': len(added), 'grants': added}
+    
+    with Heartbeat(queue, job, heartbeat_interval) as heartbeat:
+        try:
+            for start in range(job['processed'], len(grants), batch_size):
+                if heartbeat.lost.is_set():
+                    break
+                batch = grants[start:start + batch_size]
+                result = db_service.add_grants(batch)
+                if not result['success']:
+                    queue.fail(job_id, lease, result['error'], partial())
+                    logger.error(f"Job {job_id} failed after {len(added)} grant(s): {result['error']}")
+                    return
+                
+                added.extend({'id': grant['id'], 'tags': grant['tags']} for grant in result['grants_added'])
+                # Duplicates (including a batch re-run after a crash) are skipped but count as processed
+                if not queue.update_progress(job_id, lease, start + len(batch), partial()):
+                    heartbeat.lost.set()
+                    break
+            else:
+                if queue.complete(job_id, lease, partial()):
+                    logger.info(f"Job {job_id} completed: {len(added)} grant(s) added")
+                    return
+                heartbeat.lost.set()
+        except Exception as e:
+            logger.error(f"Job {job_id} crashed after {len(added)} grant(s): {e}")
+            queue.fail(job_id, lease, str(e), partial())
+            return
+    
+    logger.warning(f"Job {job_id} lease lost after {len(added)} grant(s); leaving it to its new owner")
+
+def main():
+    """Main worker loop"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds to sleep when idle')
+    parser.add_argument('--stale-after', type=float, default=600.0,
+                        help='requeue running jobs with no heartbeat for this many seconds')
+    args = parser.parse_args()
+    
+    batch_size = max(1, int(os.getenv('INGEST_BATCH_SIZE', 500)))
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    db_service = DatabaseService()
+    queue = JobQueue.from_env()
+    logger.info(f"Worker {worker_id} polling {queue.path}")
+    
+    while True:
+        requeued = queue.requeue_stale(args.stale_after)
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale job(s)")
+        
+        job = queue.claim(worker_id)
+        if job is None:
+            if args.once:
+                break
+            time.sleep(args.poll_interval)
+            continue
+        
+        logger.info(f"Processing job {job['id']} ({job['total']} grant(s))")
+        # Heartbeat well inside the stale timeout so slow batches keep their lease
+        process_job(db_service, queue, job, batch_size, heartbeat_interval=max(args.stale_after / 4, 0.1))
+
+if __name__ == "__main__":
+    main()